@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+# Decoded full-size images for the viewer, so the loop stops re-reading the
+# same file every frame:
+#
+#   images = ImageCache(image_files, max_bytes=512 << 20)
+#   img = images.get(index)               # decoded once, then from memory
+#   images.prefetch(index, direction)     # after a swipe (+1 / -1)
+#
+# Entries are kept in least-recently-used order and evicted once their
+# decoded size passes max_bytes. prefetch() decodes the next `ahead` images
+# in the swipe direction (and one behind) on background threads, and
+# cancels queued decodes that have fallen out of that window, so the image a
+# swipe lands on is usually already decoded. get() on an image whose decode
+# is already running waits for it; one still queued behind other decodes is
+# cancelled and decoded right away on the caller's thread.
+#
+# With build=..., what gets cached is build(image) (anything with .nbytes,
+# e.g. a pyramid.Pyramid), made on the same background thread.
+#
+# Cached images are shared: draw on a copy, never on what get() returns.
+
+class ImageCache:
+
+    def __init__(self, paths, max_bytes=512 << 20, ahead=3, workers=2, build=None):
+        self.paths = paths
+        self.build = build
+        self.max_bytes = max_bytes
+        self.ahead = ahead
+
+        self.lock = threading.Lock()
+        self.images = OrderedDict()        # index -> image (None if unreadable)
+        self.bytes = 0
+        self.pending = {}                  # index -> Future
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="prefetch")
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0                     # misses that found a prefetch running
+        self.decodes = 0
+        self.decode_time = 0.0
+        self.decode_max = 0.0
+
+    def decode(self, i):
+        t0 = time.perf_counter()
+        img = cv2.imread(self.paths[i])
+        if img is not None and self.build is not None:
+            img = self.build(img)
+        dt = time.perf_counter() - t0
+
+        with self.lock:
+            self.decodes += 1
+            self.decode_time += dt
+            self.decode_max = max(self.decode_max, dt)
+            self.pending.pop(i, None)
+            self.insert(i, img)
+        return img
+
+    # Caller holds the lock.
+    def insert(self, i, img):
+        if i in self.images:
+            return
+        self.images[i] = img
+        self.bytes += img.nbytes if img is not None else 0
+
+        # never evict what was just inserted, even if it alone is over budget
+        while self.bytes > self.max_bytes and len(self.images) > 1:
+            _, old = self.images.popitem(last=False)
+            self.bytes -= old.nbytes if old is not None else 0
+
+    def get(self, i):
+        with self.lock:
+            if i in self.images:
+                self.images.move_to_end(i)
+                self.hits += 1
+                return self.images[i]
+            self.misses += 1
+            fut = self.pending.get(i)
+            if fut is not None and fut.cancel():
+                del self.pending[i]
+                fut = None
+
+        if fut is not None and not fut.cancelled():
+            with self.lock:
+                self.waits += 1
+            return fut.result()
+        return self.decode(i)
+
+    def prefetch(self, index, direction=1):
+        step = 1 if direction >= 0 else -1
+        wanted = [index + step * k for k in range(1, self.ahead + 1)] + [index - step]
+        wanted = [i for i in wanted if 0 <= i < len(self.paths)]
+
+        with self.lock:
+            for i, fut in list(self.pending.items()):
+                if i not in wanted and fut.cancel():
+                    del self.pending[i]
+            for i in wanted:
+                if i not in self.images and i not in self.pending:
+                    self.pending[i] = self.pool.submit(self.decode, i)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "waits": self.waits,
+            "hit_rate": self.hits / max(lookups, 1),
+            "decode_ms": self.decode_time / max(self.decodes, 1) * 1000,
+            "decode_max_ms": self.decode_max * 1000,
+            "cached": len(self.images),
+            "cached_mb": self.bytes / (1 << 20),
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"images: {s['hits']}/{s['hits'] + s['misses']} hits ({s['hit_rate'] * 100:.0f}%), "
+                f"{s['waits']} waited on prefetch, decode {s['decode_ms']:.1f} ms avg / "
+                f"{s['decode_max_ms']:.1f} ms max, {s['cached']} cached ({s['cached_mb']:.0f} MB)")
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -4,8 +4,16 @@ import numpy as np
 import glob
 import os
 import math
+import sys
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from profiling import profiler
+
+from thumbnails import ThumbnailAtlas, ThumbnailLoader
+from image_cache import ImageCache
+from pyramid import Pyramid
+
 # ---------------- LOAD DATASET ----------------
 
 dataset_path = "dataset"
@@ -22,6 +30,10 @@ if len(image_files) == 0:
 index = len(image_files) // 2
 zoom = 1.0
 
+# pinch zoom range
+MIN_ZOOM = 0.5
+MAX_ZOOM = 3.0
+
 # ---------------- UI LAYOUT ----------------
 
 CAM_W = 640
@@ -39,6 +51,7 @@ WINDOW_H = max(CAM_H, VIEW_H)
 
 mp_hands = mp.solutions.hands
 hands = mp_hands.Hands(max_num_hands=1)
+hands.process = profiler.wrap(hands.process, "hands.process")
 mp_draw = mp.solutions.drawing_utils
 
 cap = cv2.VideoCapture(0)
@@ -54,41 +67,63 @@ SWIPE_THRESHOLD = 40
 
 # ---------------- THUMBNAILS ----------------
 
-thumbs = []
+THUMB_SIZE = (THUMB_W-10, 80)
 
-for path in image_files:
-    img = cv2.imread(path)
-    if img is None:
-        thumbs.append(None)
-        continue
+# Thumbnails are made by background threads, nearest to the current image
+# first, and kept on disk here (keyed by path, mtime and size), so the
+# window opens at once and a restart only reads the small cached files
+THUMB_CACHE = ".thumb_cache"
+
+# all thumbnails live in one uint8 array; the strip shows the slots
+# around the current image
+atlas = ThumbnailAtlas(len(image_files), THUMB_SIZE)
+thumb_panel = np.zeros((WINDOW_H, THUMB_W, 3), dtype=np.uint8)
+
+thumb_loader = ThumbnailLoader(image_files, THUMB_SIZE, THUMB_CACHE)
+thumb_loader.request(sorted(range(len(image_files)), key=lambda i: abs(i - index)))
+thumb_index = index
+
+# ---------------- IMAGE CACHE ----------------
+
+# Decoded images stay in memory up to IMAGE_CACHE_MB (least recently used
+# dropped first); after a swipe the next PREFETCH_AHEAD images in the swipe
+# direction are decoded in the background. Each is kept as a zoom pyramid,
+# so zooming only resamples the visible VIEW_W x VIEW_H window
+IMAGE_CACHE_MB = 512
+PREFETCH_AHEAD = 3
 
-    thumb = cv2.resize(img, (THUMB_W-10, 80))
-    thumbs.append(thumb)
+images = ImageCache(image_files, IMAGE_CACHE_MB << 20, PREFETCH_AHEAD,
+                    build=lambda img: Pyramid(img, MIN_ZOOM))
+direction = 1
+view_index = None
 
 # ---------------- MAIN LOOP ----------------
 
 while True:
 
-    ret, cam = cap.read()
+    with profiler.span("capture"):
+        ret, cam = cap.read()
     if not ret:
         break
 
-    cam = cv2.flip(cam, 1)
-    cam = cv2.resize(cam, (CAM_W, CAM_H))
+    with profiler.span("color"):
+        cam = cv2.flip(cam, 1)
+        cam = cv2.resize(cam, (CAM_W, CAM_H))
+        rgb = cv2.cvtColor(cam, cv2.COLOR_BGR2RGB)
 
     fingertip_data = None
 
-    rgb = cv2.cvtColor(cam, cv2.COLOR_BGR2RGB)
     result = hands.process(rgb)
 
     if result.multi_hand_landmarks:
         for hand in result.multi_hand_landmarks:
 
-            mp_draw.draw_landmarks(
-                cam,
-                hand,
-                mp_hands.HAND_CONNECTIONS
-            )
+            with profiler.span("draw"):
+                mp_draw.draw_landmarks(
+                    cam,
+                    hand,
+                    mp_hands.HAND_CONNECTIONS
+                )
 
             h, w, _ = cam.shape
 
@@ -118,10 +153,12 @@ while True:
 
             if dx > SWIPE_THRESHOLD:
                 index = max(0, index - 1)
+                direction = -1
                 cooldown = now + 0.4
 
             elif dx < -SWIPE_THRESHOLD:
                 index = min(len(image_files)-1, index + 1)
+                direction = 1
                 cooldown = now + 0.4
 
         prev_wrist_x = wx
@@ -132,64 +169,40 @@ while True:
         if prev_pinch is not None:
             dz = pinch - prev_pinch
             zoom += dz * 0.005
-            zoom = max(0.5, min(3.0, zoom))
+            zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom))
 
         prev_pinch = pinch
 
-    # ---------------- VIEW IMAGE ----------------
-
-    img = cv2.imread(image_files[index])
-
-    if img is None:
-        continue
+    if index != thumb_index:
+        thumb_loader.request(sorted(range(index-8, index+9), key=lambda i: abs(i - index)))
+        thumb_index = index
 
-    h, w = img.shape[:2]
+    for i, thumb in thumb_loader.ready():
+        atlas.put(i, thumb)
 
-    new_w = int(w * zoom)
-    new_h = int(h * zoom)
-
-    img = cv2.resize(img, (new_w, new_h))
+    # ---------------- VIEW IMAGE ----------------
 
-    canvas = np.zeros((VIEW_H, VIEW_W, 3), dtype=np.uint8)
+    if index != view_index:
+        with profiler.span("load"):
+            pyramid = images.get(index)
+        images.prefetch(index, direction)
+        view_index = index
 
-    ih, iw = img.shape[:2]
+    if pyramid is None:
+        continue
 
-    x = max(0, (iw - VIEW_W)//2)
-    y = max(0, (ih - VIEW_H)//2)
+    with profiler.span("draw"):
+        canvas = np.zeros((VIEW_H, VIEW_W, 3), dtype=np.uint8)
 
-    crop = img[y:y+VIEW_H, x:x+VIEW_W]
+        crop = pyramid.render(zoom, VIEW_W, VIEW_H)
 
-    ch, cw = crop.shape[:2]
-    canvas[:ch, :cw] = crop
+        ch, cw = crop.shape[:2]
+        canvas[:ch, :cw] = crop
 
     # ---------------- THUMBNAIL STRIP ----------------
 
-    thumb_panel = np.zeros((WINDOW_H, THUMB_W, 3), dtype=np.uint8)
-
-    y = 10
-
-    for i, thumb in enumerate(thumbs):
-
-        if thumb is None:
-            continue
-
-        th, tw = thumb.shape[:2]
-
-        thumb_panel[y:y+th, 5:5+tw] = thumb
-
-        if i == index:
-            cv2.rectangle(
-                thumb_panel,
-                (5, y),
-                (5+tw, y+th),
-                (0,255,0),
-                3
-            )
-
-        y += th + 10
-
-        if y > WINDOW_H - th:
-            break
+    with profiler.span("draw"):
+        atlas.render(thumb_panel, index)
 
     # ---------------- COMBINE UI ----------------
 
@@ -209,10 +222,26 @@ while True:
         2
     )
 
-    cv2.imshow("Gesture Dataset Viewer", combined)
+    stats = images.stats()
+    cv2.putText(
+        combined,
+        f"cache {stats['hit_rate']*100:.0f}%  decode {stats['decode_ms']:.0f} ms",
+        (CAM_W+20, 70),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.5,
+        (0,255,0),
+        1
+    )
+
+    with profiler.span("display"):
+        cv2.imshow("Gesture Dataset Viewer", combined)
+        key = cv2.waitKey(1)
 
-    if cv2.waitKey(1) == 27:
+    if key == 27:
         break
 
+print(images.summary())
+images.close()
+thumb_loader.close()
 cap.release()
 cv2.destroyAllWindows()
\ No newline at end of file
@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+# Multi-resolution copy of an image for the zoomed view:
+#
+#   pyramid = Pyramid(image, min_zoom=0.5)
+#   view = pyramid.render(zoom, 640, 480)
+#
+# Level k is the image halved k times (cv2.pyrDown), built only as far as
+# zooms down to min_zoom can reach (levels 0 and 1 for 0.5). render() takes
+# the smallest level that is still at least as large as the zoomed image,
+# so it never shrinks by more than 2x, and resamples only the visible
+# viewport out of it with a single warpAffine: the cost follows the
+# viewport size, not the photo's resolution or the zoom.
+
+class Pyramid:
+
+    def __init__(self, image, min_zoom=0.5):
+        self.shape = image.shape
+        self.levels = [image]
+
+        while 0.5 ** len(self.levels) >= min_zoom and min(self.levels[-1].shape[:2]) >= 2:
+            self.levels.append(cv2.pyrDown(self.levels[-1]))
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels)
+
+    # The centred view_w x view_h window of the image scaled by zoom (all of
+    # it when smaller), as resizing the whole image and cropping would give.
+    def render(self, zoom, view_w, view_h):
+        h, w = self.shape[:2]
+        new_w = int(w * zoom)
+        new_h = int(h * zoom)
+
+        x = max(0, (new_w - view_w) // 2)
+        y = max(0, (new_h - view_h) // 2)
+
+        k = 0
+        while k + 1 < len(self.levels) and zoom <= 0.5 ** (k + 1):
+            k += 1
+        src = self.levels[k]
+
+        # level -> zoomed image, pixel centres aligned like cv2.resize, then
+        # shifted so the crop corner lands at (0, 0)
+        rx = new_w / src.shape[1]
+        ry = new_h / src.shape[0]
+        M = np.float32([[rx, 0, 0.5 * rx - 0.5 - x],
+                        [0, ry, 0.5 * ry - 0.5 - y]])
+
+        return cv2.warpAffine(src, M, (min(view_w, new_w), min(view_h, new_h)),
+                              flags=cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_REPLICATE)
@@ -0,0 +1,188 @@
+import hashlib
+import heapq
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# Thumbnails for the viewer's strip, made off the UI thread:
+#
+#   loader = ThumbnailLoader(image_files, (110, 80), cache_dir=".thumb_cache")
+#   loader.request(order)                 # indices, most wanted first
+#   for i, thumb in loader.ready():       # every frame, never blocks
+#       atlas.put(i, thumb)
+#
+# JPEGs are decoded at 1/8, 1/4 or 1/2 scale (libjpeg DCT scaling through
+# IMREAD_REDUCED_COLOR_*), the coarsest that still covers the thumbnail, so
+# a 24 MP photo is never decoded at full size. Finished thumbnails are
+# written to cache_dir as PNGs named by a hash of path, mtime, file size and
+# thumbnail size: an edited file gets a new key, and the next start only
+# reads the small PNGs.
+#
+# A later request() jumps ahead of everything queued before it, so the
+# thumbnails around the current image come first after a swipe.
+
+REDUCED = ((4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2), (1, cv2.IMREAD_COLOR))
+
+def cache_key(path, size):
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{size[0]}x{size[1]}"
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+# Decoded image, at the coarsest JPEG scale that is still at least `size`.
+def read_reduced(path, size):
+    data = np.fromfile(path, dtype=np.uint8)
+    if not data.size:
+        return None
+    if not path.lower().endswith((".jpg", ".jpeg")):
+        return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+    img = cv2.imdecode(data, cv2.IMREAD_REDUCED_COLOR_8)
+    if img is None:
+        return None
+
+    # 1/8 undershoots small photos: full size is ~8x this, pick the scale that fits
+    h, w = img.shape[:2]
+    if w >= size[0] and h >= size[1]:
+        return img
+    for factor, flag in REDUCED:
+        if factor == 1 or (w * 8 // factor >= size[0] and h * 8 // factor >= size[1]):
+            return cv2.imdecode(data, flag)
+
+def make_thumb(path, size, cache_dir=None):
+    cached = os.path.join(cache_dir, cache_key(path, size) + ".png") if cache_dir else None
+    if cached and os.path.exists(cached):
+        thumb = cv2.imread(cached)
+        if thumb is not None:
+            return thumb
+
+    img = read_reduced(path, size)
+    if img is None:
+        return None
+    thumb = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+    if cached:
+        tmp = cached[:-4] + ".tmp.png"
+        cv2.imwrite(tmp, thumb)
+        os.replace(tmp, cached)
+    return thumb
+
+class ThumbnailLoader:
+
+    def __init__(self, paths, size, cache_dir=None, workers=None):
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.paths = paths
+        self.size = size
+        self.cache_dir = cache_dir
+
+        self.lock = threading.Condition()
+        self.heap = []                 # (-generation, rank, index)
+        self.generation = 0
+        self.started = set()
+        self.done = []
+        self.closed = False
+
+        self.threads = [threading.Thread(target=self.run, name=f"thumbs-{n}", daemon=True)
+                        for n in range(workers or min(8, os.cpu_count() or 4))]
+        for t in self.threads:
+            t.start()
+
+    # Queue these indices (most wanted first) ahead of earlier requests.
+    def request(self, indices):
+        with self.lock:
+            self.generation += 1
+            for rank, i in enumerate(indices):
+                if 0 <= i < len(self.paths) and i not in self.started:
+                    heapq.heappush(self.heap, (-self.generation, rank, i))
+            self.lock.notify_all()
+
+    # (index, thumbnail or None if unreadable) finished since the last call.
+    def ready(self):
+        with self.lock:
+            done, self.done = self.done, []
+        return done
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.heap and not self.closed:
+                    self.lock.wait()
+                if self.closed:
+                    return
+                _, _, i = heapq.heappop(self.heap)
+                if i in self.started:
+                    continue
+                self.started.add(i)
+
+            try:
+                thumb = make_thumb(self.paths[i], self.size, self.cache_dir)
+            except (OSError, cv2.error):
+                thumb = None
+
+            with self.lock:
+                self.done.append((i, thumb))
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+
+# Every thumbnail in one contiguous (n, h, w, 3) uint8 array, slot i holding
+# image i, and the strip drawn from the slots around the current image:
+#
+#   atlas = ThumbnailAtlas(len(image_files), (110, 80))
+#   atlas.put(i, thumb)
+#   atlas.render(panel, index)
+#
+# render() copies the visible slots into the panel with one strided slice
+# assignment, so its cost depends on the panel height, not the dataset size.
+# Slots without a thumbnail (not made yet, or unreadable) show an outline,
+# drawn at render time so the array is only touched where thumbnails land.
+
+class ThumbnailAtlas:
+
+    def __init__(self, n, size, gap=10, margin=5):
+        w, h = size
+        self.size = size
+        self.gap = gap
+        self.margin = margin
+        self.pitch = h + gap
+
+        self.pixels = np.zeros((n, h, w, 3), dtype=np.uint8)
+        self.filled = np.zeros(n, dtype=bool)
+
+    def __len__(self):
+        return len(self.pixels)
+
+    def put(self, i, thumb):
+        if thumb is not None:
+            self.pixels[i] = thumb
+            self.filled[i] = True
+
+    # First and last + 1 slot of a `rows` long window centred on index,
+    # shifted to stay inside the atlas at either end.
+    def window(self, index, rows):
+        first = min(max(index - rows // 2, 0), max(len(self) - rows, 0))
+        return first, min(first + rows, len(self))
+
+    # Draws the strip into panel (contiguous, at least w + margin wide).
+    def render(self, panel, index):
+        w, h = self.size
+        rows = (panel.shape[0] - self.gap) // self.pitch
+        first, last = self.window(index, rows)
+        k = last - first
+
+        panel[:] = 0
+        top = self.gap
+        slots = panel[top:top + k * self.pitch].reshape(k, self.pitch, panel.shape[1], 3)
+        slots[:, :h, self.margin:self.margin + w] = self.pixels[first:last]
+
+        for k in np.flatnonzero(~self.filled[first:last]):
+            y = top + k * self.pitch
+            cv2.rectangle(panel, (self.margin, y), (self.margin + w - 1, y + h - 1), (60, 60, 60), 1)
+
+        y = top + (index - first) * self.pitch
+        cv2.rectangle(panel, (self.margin, y), (self.margin + w, y + h), (0, 255, 0), 3)
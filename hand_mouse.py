@@ -4,6 +4,7 @@ import pyautogui
 import numpy as np
 import time
 import math
+from profiling import profiler
 
 # ---------------- SCREEN SIZE ----------------
 
@@ -20,6 +21,8 @@ hands = mp_hands.Hands(
 
 mp_draw = mp.solutions.drawing_utils
 
+hands.process = profiler.wrap(hands.process, "hands.process")
+
 # ---------------- CAMERA ----------------
 
 cap = cv2.VideoCapture(0)
@@ -40,14 +43,16 @@ CLICK_DELAY = 0.5
 
 while True:
 
-    ret, frame = cap.read()
+    with profiler.span("capture"):
+        ret, frame = cap.read()
     if not ret:
         break
 
-    frame = cv2.flip(frame, 1)
-    frame = cv2.resize(frame, (cam_w, cam_h))
+    with profiler.span("color"):
+        frame = cv2.flip(frame, 1)
+        frame = cv2.resize(frame, (cam_w, cam_h))
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     result = hands.process(rgb)
 
     fingertip = None
@@ -56,11 +61,12 @@ while True:
     if result.multi_hand_landmarks:
         for hand in result.multi_hand_landmarks:
 
-            mp_draw.draw_landmarks(
-                frame,
-                hand,
-                mp_hands.HAND_CONNECTIONS
-            )
+            with profiler.span("draw"):
+                mp_draw.draw_landmarks(
+                    frame,
+                    hand,
+                    mp_hands.HAND_CONNECTIONS
+                )
 
             h, w, _ = frame.shape
 
@@ -117,9 +123,11 @@ while True:
 
     # ---------------- DISPLAY ----------------
 
-    cv2.imshow("Hand Mouse Control", frame)
+    with profiler.span("display"):
+        cv2.imshow("Hand Mouse Control", frame)
+        key = cv2.waitKey(1)
 
-    if cv2.waitKey(1) == 27:
+    if key == 27:
         break
 
 cap.release()
@@ -4,10 +4,14 @@ import numpy as np
 import random
 import time
 import os
+import sys
 import math
 import threading
 from queue import Queue
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from profiling import profiler
+
 sound_queue = Queue()
 
 # –––––––– SETTINGS ––––––––
@@ -109,6 +113,8 @@ hands = mp_hands.Hands(max_num_hands=1)
 mp_draw = mp.solutions.drawing_utils
 mp_styles = mp.solutions.drawing_styles
 
+hands.process = profiler.wrap(hands.process, "hands.process")
+
 cap = cv2.VideoCapture(0)
 
 player = input("Enter Player Name: ")
@@ -125,29 +131,32 @@ hover_start = 0
 hovering = False
 
 while True:
-    ret, frame = cap.read()
+    with profiler.span("capture"):
+        ret, frame = cap.read()
     if not ret:
         break
 
-    frame = cv2.flip(frame, 1)
+    with profiler.span("color"):
+        frame = cv2.flip(frame, 1)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
     fingertip = None
 
     # Hand detection
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     result = hands.process(rgb)
 
     if result.multi_hand_landmarks:
         for hand in result.multi_hand_landmarks:
 
             # draw full hand skeleton
-            mp_draw.draw_landmarks(
-                frame,
-                hand,
-                mp_hands.HAND_CONNECTIONS,
-                mp_styles.get_default_hand_landmarks_style(),
-                mp_styles.get_default_hand_connections_style()
-            )
+            with profiler.span("draw"):
+                mp_draw.draw_landmarks(
+                    frame,
+                    hand,
+                    mp_hands.HAND_CONNECTIONS,
+                    mp_styles.get_default_hand_landmarks_style(),
+                    mp_styles.get_default_hand_connections_style()
+                )
 
             h, w, _ = frame.shape
             tip = hand.landmark[8]  # index fingertip
@@ -360,10 +369,12 @@ while True:
             else:
                 hovering = False
 
-    cv2.imshow("Webcam", frame)
-    cv2.imshow("Game", game)
+    with profiler.span("display"):
+        cv2.imshow("Webcam", frame)
+        cv2.imshow("Game", game)
+        key = cv2.waitKey(16)
 
-    if cv2.waitKey(16) == 27:
+    if key == 27:
         break
 
 cap.release()
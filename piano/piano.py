@@ -2,9 +2,13 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import os
+import sys
 import threading
 from queue import Queue
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from profiling import profiler
+
 # ---------------- SOUND ENGINE ----------------
 
 sound_queue = Queue()
@@ -45,6 +49,8 @@ mp_hands = mp.solutions.hands
 hands = mp_hands.Hands(max_num_hands=1)
 mp_draw = mp.solutions.drawing_utils
 
+hands.process = profiler.wrap(hands.process, "hands.process")
+
 cap = cv2.VideoCapture(0)
 
 # ---------------- PIANO SETUP ----------------
@@ -63,26 +69,29 @@ cooldown = 0.2  # seconds
 
 while True:
 
-    ret, frame = cap.read()
+    with profiler.span("capture"):
+        ret, frame = cap.read()
     if not ret:
         break
 
-    frame = cv2.flip(frame, 1)
-    frame = cv2.resize(frame, (WIDTH, HEIGHT))
+    with profiler.span("color"):
+        frame = cv2.flip(frame, 1)
+        frame = cv2.resize(frame, (WIDTH, HEIGHT))
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
     fingertips = []
 
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     result = hands.process(rgb)
 
     if result.multi_hand_landmarks:
         for hand in result.multi_hand_landmarks:
 
-            mp_draw.draw_landmarks(
-                frame,
-                hand,
-                mp_hands.HAND_CONNECTIONS
-            )
+            with profiler.span("draw"):
+                mp_draw.draw_landmarks(
+                    frame,
+                    hand,
+                    mp_hands.HAND_CONNECTIONS
+                )
 
             h, w, _ = frame.shape
             tip_ids = [4, 8, 12, 16, 20]  # thumb → pinky
@@ -160,9 +169,11 @@ while True:
                         4
                     )
 
-    cv2.imshow("Virtual Piano", frame)
+    with profiler.span("display"):
+        cv2.imshow("Virtual Piano", frame)
+        key = cv2.waitKey(1)
 
-    if cv2.waitKey(1) == 27:
+    if key == 27:
         break
 
 cap.release()
@@ -0,0 +1,175 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Stage timers shared by the camera scripts (YOLO, MediaPipe hand apps, the
+# game). Off unless the PROFILE environment variable is set:
+#
+#   PROFILE=1 python hand_mouse.py
+#   PROFILE=1 PROFILE_OUT=eco_trace.json python yolo/eco_indc_ui.py
+#
+# In the script:
+#
+#   from profiling import profiler
+#
+#   with profiler.span("capture"):
+#       ret, frame = cap.read()
+#
+#   hands.process = profiler.wrap(hands.process, "hands.process")
+#
+#   @profiler.timed("scoring")
+#   def score_frame(...): ...
+#
+# Spans go into preallocated ring buffers (the newest `capacity` spans are
+# kept). At exit a summary table is printed and a Chrome trace is written
+# to PROFILE_OUT (open it in chrome://tracing or https://ui.perfetto.dev).
+# When profiling is off, span() hands back one shared no-op context
+# manager and wrap() / timed() return the function unchanged.
+#
+# Scripts in subfolders add the repo root to sys.path before importing.
+
+class NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Span:
+
+    __slots__ = ("profiler", "name_id", "t0")
+
+    def __init__(self, profiler, name_id):
+        self.profiler = profiler
+        self.name_id = name_id
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name_id, self.t0, time.perf_counter())
+        return False
+
+class Profiler:
+
+    def __init__(self, enabled=False, capacity=200_000):
+        self.enabled = enabled
+        self.capacity = capacity
+
+        self.names = {}
+        self.name_ids = np.zeros(capacity, dtype=np.int32)
+        self.starts = np.zeros(capacity, dtype=np.float64)
+        self.ends = np.zeros(capacity, dtype=np.float64)
+        self.tids = np.zeros(capacity, dtype=np.int64)
+
+        # record() is called from every pipeline thread; the slot claim, its
+        # fill and the written count move together under one lock
+        self.lock = threading.Lock()
+        self.written = 0
+        self.origin = time.perf_counter()
+
+    def name_id(self, name):
+        with self.lock:
+            return self.names.setdefault(name, len(self.names))
+
+    def record(self, name_id, t0, t1):
+        tid = threading.get_ident()
+        with self.lock:
+            slot = self.written % self.capacity
+            self.name_ids[slot] = name_id
+            self.starts[slot] = t0
+            self.ends[slot] = t1
+            self.tids[slot] = tid
+            self.written += 1
+
+    # ---------- TIMERS ----------
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, self.name_id(name))
+
+    def wrap(self, fn, name):
+        if not self.enabled:
+            return fn
+
+        name_id = self.name_id(name)
+        record = self.record
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name_id, t0, time.perf_counter())
+
+        return timed
+
+    def timed(self, name):
+        return lambda fn: self.wrap(fn, name)
+
+    # ---------- REPORTS ----------
+
+    # Recorded spans in time order as (name_ids, starts, ends, tids).
+    def spans(self):
+        n = min(self.written, self.capacity)
+        order = np.argsort(self.starts[:n], kind="stable")
+        return (self.name_ids[:n][order], self.starts[:n][order],
+                self.ends[:n][order], self.tids[:n][order])
+
+    def summary(self):
+        name_ids, starts, ends, _ = self.spans()
+        if not len(starts):
+            return "profile: no spans recorded"
+
+        wall = ends.max() - starts.min()
+        dur = (ends - starts) * 1000
+
+        lines = [f"{'stage':<18}{'calls':>8}{'mean ms':>10}{'p50':>9}{'p95':>9}"
+                 f"{'max':>9}{'% wall':>9}"]
+        for name, i in sorted(self.names.items(), key=lambda kv: -dur[name_ids == kv[1]].sum()):
+            d = dur[name_ids == i]
+            if not len(d):
+                continue
+            lines.append(f"{name:<18}{len(d):>8}{d.mean():>10.2f}{np.percentile(d, 50):>9.2f}"
+                         f"{np.percentile(d, 95):>9.2f}{d.max():>9.2f}"
+                         f"{d.sum() / 10 / max(wall, 1e-9):>9.1f}")
+        if self.written > self.capacity:
+            lines.append(f"(last {self.capacity} of {self.written} spans)")
+        return "\n".join(lines)
+
+    def export_chrome(self, path):
+        name_ids, starts, ends, tids = self.spans()
+        names = {i: name for name, i in self.names.items()}
+        threads = {tid: n for n, tid in enumerate(np.unique(tids).tolist())}
+        pid = os.getpid()
+
+        events = [
+            {"name": names[i], "ph": "X", "pid": pid, "tid": threads[t],
+             "ts": (s - self.origin) * 1e6, "dur": (e - s) * 1e6}
+            for i, s, e, t in zip(name_ids.tolist(), starts.tolist(), ends.tolist(), tids.tolist())
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def dump(self):
+        if not self.written:
+            return
+        path = os.environ.get("PROFILE_OUT", "profile_trace.json")
+        self.export_chrome(path)
+        print(self.summary(), file=sys.stderr)
+        print(f"trace written to {path}", file=sys.stderr)
+
+profiler = Profiler(enabled=os.environ.get("PROFILE", "") not in ("", "0"))
+
+if profiler.enabled:
+    atexit.register(profiler.dump)
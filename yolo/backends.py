@@ -0,0 +1,239 @@
+import argparse
+import glob
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from eco_scoring import box_arrays
+from tracking import iou_matrix, greedy_match
+
+# CPU inference backends behind one call:
+#
+#   model = load_model("openvino-int8", "yolov8n.pt", calib_dir="calib_frames")
+#
+# The PyTorch weights are exported once (ONNX / OpenVINO, optionally INT8
+# post-training quantized on a folder of sample frames) and the export is
+# cached next to the weights, keyed on the input size and (INT8) the
+# calibration folder. Exports have a dynamic batch axis, so the batched
+# callers (batch_score, multi_cam, tiling) can feed them. Every backend is
+# loaded back through YOLO(), so results keep the usual .boxes / .plot()
+# layout the scripts score from.
+#
+#   python backends.py compare --images calib_frames --calib-dir calib_frames
+#
+# prints speed and agreement with the PyTorch reference for each backend
+# (the -int8 ones only with --calib-dir).
+
+BACKENDS = ("torch", "onnx", "onnx-int8", "openvino", "openvino-int8")
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def exported_path(weights, backend, imgsz=640, calib_dir=None):
+    stem = f"{os.path.splitext(weights)[0]}_{imgsz}"
+    calib = hashlib.blake2b(os.path.abspath(calib_dir or "").encode(), digest_size=4).hexdigest()
+    return {
+        "torch": weights,
+        "onnx": f"{stem}.onnx",
+        "onnx-int8": f"{stem}_int8_{calib}.onnx",
+        "openvino": f"{stem}_openvino_model",
+        "openvino-int8": f"{stem}_int8_{calib}_openvino_model",
+    }[backend]
+
+def list_images(folder, limit=None):
+    files = sorted(f for f in glob.glob(os.path.join(folder, "*"))
+                   if f.lower().endswith(IMAGE_EXTS))
+    return files[:limit] if limit else files
+
+# ---------- EXPORT ----------
+
+# Letterbox to a square imgsz input the way YOLO preprocesses frames.
+def letterbox(img, imgsz):
+    h, w = img.shape[:2]
+    r = imgsz / max(h, w)
+    nh, nw = int(round(h * r)), int(round(w * r))
+
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas[top:top+nh, left:left+nw] = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return canvas
+
+# Ultralytics calibrates OpenVINO INT8 from a dataset yaml; point one at the
+# sample frame folder.
+def calib_yaml(calib_dir, names, workdir):
+    path = os.path.join(workdir, "calib.yaml")
+    with open(path, "w") as f:
+        f.write(f"path: {os.path.abspath(calib_dir)}\ntrain: .\nval: .\nnames:\n")
+        for i in sorted(names):
+            f.write(f"  {i}: {names[i]}\n")
+    return path
+
+def quantize_onnx(src, dst, calib_dir, imgsz):
+    try:
+        import onnxruntime as ort
+        from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+                                              QuantType, quantize_static)
+    except ImportError:
+        raise SystemExit("onnx-int8 needs onnxruntime: pip install onnxruntime")
+
+    input_name = ort.InferenceSession(src, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    files = list_images(calib_dir, limit=300)
+
+    class FrameReader(CalibrationDataReader):
+
+        def __init__(self):
+            self.files = iter(files)
+
+        def get_next(self):
+            for path in self.files:
+                img = cv2.imread(path)
+                if img is None:
+                    continue
+                x = cv2.cvtColor(letterbox(img, imgsz), cv2.COLOR_BGR2RGB)
+                x = x.transpose(2, 0, 1)[None].astype(np.float32) / 255
+                return {input_name: x}
+            return None
+
+    quantize_static(src, dst, FrameReader(),
+                    quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8)
+
+def export(backend, weights, imgsz=640, calib_dir=None):
+    path = exported_path(weights, backend, imgsz, calib_dir)
+    int8 = backend.endswith("-int8")
+
+    if int8 and not calib_dir:
+        raise ValueError(f"{backend} needs calib_dir with sample frames for INT8 calibration")
+
+    base = YOLO(weights)
+
+    if backend == "onnx":
+        out = base.export(format="onnx", imgsz=imgsz, dynamic=True)
+    elif backend == "openvino":
+        out = base.export(format="openvino", imgsz=imgsz, dynamic=True)
+    elif backend == "openvino-int8":
+        with tempfile.TemporaryDirectory() as tmp:
+            out = base.export(format="openvino", imgsz=imgsz, dynamic=True, int8=True,
+                              data=calib_yaml(calib_dir, base.names, tmp))
+    elif backend == "onnx-int8":
+        fp32 = exported_path(weights, "onnx", imgsz)
+        if not os.path.exists(fp32):
+            export("onnx", weights, imgsz)
+        quantize_onnx(fp32, path, calib_dir, imgsz)
+        out = path
+    else:
+        raise ValueError(f"unknown backend: {backend}")
+
+    out = str(out).rstrip(os.sep)
+    if os.path.abspath(out) != os.path.abspath(path):
+        shutil.move(out, path)
+    return path
+
+# ---------- LOAD ----------
+
+def load_model(backend="torch", weights="yolov8n.pt", imgsz=640, calib_dir=None):
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend: {backend} (choose from {', '.join(BACKENDS)})")
+
+    path = exported_path(weights, backend, imgsz, calib_dir)
+    if backend != "torch" and not os.path.exists(path):
+        print(f"exporting {weights} -> {path}")
+        export(backend, weights, imgsz, calib_dir)
+
+    return YOLO(path, task="detect")
+
+# The file a loaded model came from: for torch the checkpoint ultralytics
+# resolved (a bare "yolov8n.pt" is downloaded to its weights folder on first
+# use), otherwise the export.
+def model_path(model, weights, backend, imgsz=640, calib_dir=None):
+    return getattr(model, "ckpt_path", None) or exported_path(weights, backend, imgsz, calib_dir)
+
+# ---------- COMPARISON ----------
+
+# Share of reference boxes found (recall) and of backend boxes that match a
+# reference box (precision), same class and IoU >= 0.5.
+def agreement(dets, ref):
+    matched = found = expected = 0
+    for (a, ca, _), (b, cb, _) in zip(dets, ref):
+        if len(a) and len(b):
+            iou = np.where(ca[:, None] == cb[None, :], iou_matrix(a, b), 0.0)
+            rows, _ = greedy_match(iou, 0.5)
+            matched += len(rows)
+        found += len(a)
+        expected += len(b)
+    return matched / max(found, 1), matched / max(expected, 1)
+
+def compare(images, backends, weights, imgsz, calib_dir, conf):
+    files = list_images(images)
+    if not files:
+        raise SystemExit(f"No images in {images}")
+    frames = [img for img in (cv2.imread(f) for f in files) if img is not None]
+
+    ref = None
+    rows = []
+
+    for backend in backends:
+        model = load_model(backend, weights, imgsz, calib_dir)
+        model(frames[0], imgsz=imgsz, verbose=False)   # warm-up
+
+        times, dets = [], []
+        for img in frames:
+            t0 = time.perf_counter()
+            res = model(img, conf=conf, imgsz=imgsz, verbose=False)[0]
+            times.append(time.perf_counter() - t0)
+            dets.append(box_arrays(res))
+
+        if ref is None:
+            ref = dets
+        precision, recall = agreement(dets, ref)
+
+        ms = np.array(times) * 1000
+        rows.append((backend, ms.mean(), np.percentile(ms, 95), 1000 / ms.mean(),
+                     precision, recall))
+
+    print(f"{'backend':<15}{'mean ms':>9}{'p95 ms':>9}{'FPS':>8}{'prec':>7}{'recall':>8}")
+    for backend, mean, p95, fps, p, r in rows:
+        speedup = rows[0][1] / mean
+        print(f"{backend:<15}{mean:>9.1f}{p95:>9.1f}{fps:>8.1f}{p:>7.2f}{r:>8.2f}  x{speedup:.2f}")
+    print(f"(agreement measured against {backends[0]})")
+
+def main():
+    ap = argparse.ArgumentParser(description="Export / compare YOLO CPU backends")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ex = sub.add_parser("export", help="export and cache a backend")
+    ex.add_argument("backend", choices=BACKENDS)
+
+    cmp_ = sub.add_parser("compare", help="accuracy vs speed report")
+    cmp_.add_argument("--images", required=True, help="folder of test frames")
+    cmp_.add_argument("--backends", nargs="+", choices=BACKENDS,
+                      help="default: all, or all but the -int8 ones without --calib-dir")
+    cmp_.add_argument("--conf", type=float, default=0.25)
+
+    for p in (ex, cmp_):
+        p.add_argument("--weights", default="yolov8n.pt")
+        p.add_argument("--imgsz", type=int, default=640)
+        p.add_argument("--calib-dir", help="sample frames for INT8 calibration")
+
+    args = ap.parse_args()
+
+    if args.cmd == "compare" and args.backends is None:
+        args.backends = [b for b in BACKENDS if args.calib_dir or not b.endswith("-int8")]
+    requested = [args.backend] if args.cmd == "export" else args.backends
+    int8 = [b for b in requested if b.endswith("-int8")]
+    if int8 and not args.calib_dir:
+        ap.error(f"--calib-dir is required for {', '.join(int8)}")
+
+    if args.cmd == "export":
+        print(export(args.backend, args.weights, args.imgsz, args.calib_dir))
+    else:
+        compare(args.images, args.backends, args.weights, args.imgsz, args.calib_dir, args.conf)
+
+if __name__ == "__main__":
+    main()
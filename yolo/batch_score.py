@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from backends import BACKENDS, load_model, model_path
+from det_cache import DetectionCache, cache_key, content_hash, detect_batch, model_fingerprint
+from eco_scoring import PRESETS, class_table, box_geometry, score_boxes, eco_index
+from tracking import MultiObjectTracker
+from writers import open_writer, part_path, readable_parts
+
+# Headless eco scoring of recorded footage:
+#
+#   python batch_score.py videos/ --model linear --batch 16 --out eco.csv
+#
+# Writes one row per frame to eco.csv and one row per box to eco_boxes.csv
+# (or .parquet). Every --checkpoint-every frames the outputs are flushed and
+# the progress and output positions checkpointed to <out>.ckpt.json, so an
+# interrupted run continues with --resume, dropping any rows written after
+# the last checkpoint.
+#
+# With --cache detections.sqlite the raw detections are kept between runs;
+# re-scoring the same footage with another --model or emission table then
+# only decodes and scores.
+
+VIDEO_EXTS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm")
+
+FRAME_FIELDS = [
+    ("video", "str"), ("frame", "int"), ("time_s", "float"),
+    ("eco_index", "float"), ("total_impact", "float"),
+    ("boxes", "int"), ("class_contrib", "str"),
+]
+
+BOX_FIELDS = [
+    ("video", "str"), ("frame", "int"), ("track_id", "int"),
+    ("cls", "str"), ("conf", "float"),
+    ("x1", "int"), ("y1", "int"), ("x2", "int"), ("y2", "int"),
+    ("base", "float"), ("size", "float"), ("motion", "float"), ("impact", "float"),
+]
+
+# ---------- INPUTS ----------
+
+def find_videos(paths):
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos += [os.path.join(root, f) for f in files
+                           if f.lower().endswith(VIDEO_EXTS)]
+        else:
+            videos.append(path)
+    return sorted(videos)
+
+# ---------- OUTPUT ----------
+
+def boxes_path(out):
+    stem, ext = os.path.splitext(out)
+    return f"{stem}_boxes{ext}"
+
+# ---------- CHECKPOINT ----------
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"videos": {}, "done": []}
+
+def save_checkpoint(path, ckpt):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(ckpt, f)
+    os.replace(tmp, path)
+
+# Flush the outputs, then record how far they go.
+def checkpoint(writers, ckpt, ckpt_path):
+    for w in writers:
+        w.flush()
+    ckpt["outputs"] = [w.position() for w in writers]
+    save_checkpoint(ckpt_path, ckpt)
+
+# A checkpointed Parquet part that cannot be read back (lost in a system
+# crash): resume after the last readable part, with each video's progress
+# taken from the frame rows those parts hold.
+def rollback_parquet(out, ckpt):
+    import pyarrow.parquet as pq
+
+    parts = ckpt["outputs"]
+    n = min(readable_parts(out, parts[0]), readable_parts(boxes_path(out), parts[1]))
+    if n == min(parts):
+        return ckpt
+
+    print(f"warning: Parquet part {n} of {out} or {boxes_path(out)} cannot be read, "
+          f"rescoring from there")
+    videos = {}
+    for part in range(n):
+        t = pq.read_table(part_path(out, part), columns=["video", "frame"]).to_pydict()
+        for video, frame in zip(t["video"], t["frame"]):
+            videos[video] = max(videos.get(video, 0), frame + 1)
+    return {"videos": videos, "done": [], "outputs": [n, n]}
+
+# ---------- SCORING ----------
+
+def score_video(path, model, names, args, preset, table, writers, ckpt, ckpt_path, cache=None):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"skip {path}: cannot open")
+        return 0
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    idx = ckpt["videos"].get(path, 0)
+    if idx:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+
+    frame_out, box_out = writers
+    tracker = MultiObjectTracker()
+    scored_frames = 0
+    last_ckpt = idx
+
+    while True:
+
+        batch = []
+        while len(batch) < args.batch:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            batch.append(frame)
+
+        if not batch:
+            break
+
+        keys = None
+        if cache is not None:
+            keys = [cache_key(content_hash(frame), args.fingerprint, args.cache_params)
+                    for frame in batch]
+
+        dets = detect_batch(model, batch,
+                            {"conf": args.conf, "imgsz": args.imgsz, "verbose": False},
+                            cache, keys)
+
+        frame_rows, box_rows = [], []
+
+        for frame, (xyxy, cls, conf) in zip(batch, dets):
+            h, w = frame.shape[:2]
+            ts = idx / fps
+
+            xy, _, area = box_geometry(xyxy, w, h)
+            ids, speed = tracker.update(xy, cls, ts)
+
+            s = score_boxes(
+                xy, cls, conf, area, speed * preset["speed_scale"], table,
+                model=args.model, **preset["params"]
+            )
+
+            contrib = {names[i]: round(float(s.class_contrib[i]), 4)
+                       for i in np.flatnonzero(s.class_contrib)}
+
+            frame_rows.append({
+                "video": path, "frame": idx, "time_s": round(ts, 3),
+                "eco_index": round(float(eco_index(s.total, preset["max_impact"])), 3),
+                "total_impact": round(s.total, 4),
+                "boxes": len(cls), "class_contrib": json.dumps(contrib),
+            })
+
+            for tid, (x1, y1, x2, y2), c, cf, base, sz, mo, imp in zip(
+                    ids.tolist(), s.xyxy.tolist(), s.cls.tolist(), s.conf.tolist(),
+                    s.base.tolist(), s.size.tolist(), s.motion.tolist(), s.impact.tolist()):
+                box_rows.append({
+                    "video": path, "frame": idx, "track_id": tid,
+                    "cls": names[c], "conf": round(cf, 4),
+                    "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+                    "base": base, "size": round(sz, 4),
+                    "motion": round(mo, 4), "impact": round(imp, 4),
+                })
+
+            idx += 1
+
+        frame_out.write(frame_rows)
+        box_out.write(box_rows)
+
+        ckpt["videos"][path] = idx
+        if idx - last_ckpt >= args.checkpoint_every:
+            checkpoint(writers, ckpt, ckpt_path)
+            last_ckpt = idx
+
+        scored_frames += len(batch)
+
+    if idx != last_ckpt:
+        checkpoint(writers, ckpt, ckpt_path)
+
+    cap.release()
+    return scored_frames
+
+# ---------- MAIN ----------
+
+def main():
+    ap = argparse.ArgumentParser(description="Score recorded video with the eco impact model")
+    ap.add_argument("inputs", nargs="+", help="video files or folders")
+    ap.add_argument("--model", choices=sorted(PRESETS), default="linear",
+                    help="impact model (linear: ecological_indicator.py, hybrid: eco_indicator_2.py)")
+    ap.add_argument("--weights", default="yolov8n.pt")
+    ap.add_argument("--backend", choices=BACKENDS, default="torch")
+    ap.add_argument("--calib-dir", help="sample frames for the -int8 backends")
+    ap.add_argument("--batch", type=int, default=16, help="frames per model() call")
+    ap.add_argument("--conf", type=float, default=0.35)
+    ap.add_argument("--imgsz", type=int, default=640)
+    ap.add_argument("--out", default="eco_scores.csv", help=".csv or .parquet")
+    ap.add_argument("--resume", action="store_true", help="continue from <out>.ckpt.json")
+    ap.add_argument("--checkpoint-every", type=int, default=2048,
+                    help="frames between checkpoints (each one a new Parquet part)")
+    ap.add_argument("--cache", help="detection cache file (SQLite), reused across runs")
+    ap.add_argument("--cache-mb", type=int, default=2048, help="evict least recently used beyond this")
+    args = ap.parse_args()
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        raise SystemExit("No videos found")
+
+    ckpt_path = args.out + ".ckpt.json"
+    ckpt = load_checkpoint(ckpt_path) if args.resume else {"videos": {}, "done": []}
+    if args.resume and args.out.endswith(".parquet") and "outputs" in ckpt:
+        ckpt = rollback_parquet(args.out, ckpt)
+
+    model = load_model(args.backend, args.weights, args.imgsz, args.calib_dir)
+    names = model.names
+
+    preset = PRESETS[args.model]
+    table = class_table(preset["scores"], names, preset["transform"])
+
+    cache = None
+    if args.cache:
+        cache = DetectionCache(args.cache, args.cache_mb << 20)
+        args.fingerprint = model_fingerprint(
+            model_path(model, args.weights, args.backend, args.imgsz, args.calib_dir))
+        args.cache_params = {"backend": args.backend, "conf": args.conf, "imgsz": args.imgsz}
+
+    # rows written after the last checkpoint are scored again, cut them off
+    resume_at = ckpt.get("outputs", [None, None])
+    writers = (open_writer(args.out, FRAME_FIELDS, args.resume, resume_at[0]),
+               open_writer(boxes_path(args.out), BOX_FIELDS, args.resume, resume_at[1]))
+    checkpoint(writers, ckpt, ckpt_path)
+
+    total_frames = 0
+    t0 = time.perf_counter()
+
+    try:
+        for path in videos:
+            if path in ckpt["done"]:
+                continue
+
+            v0 = time.perf_counter()
+            n = score_video(path, model, names, args, preset, table, writers, ckpt, ckpt_path, cache)
+            dt = time.perf_counter() - v0
+
+            ckpt["done"].append(path)
+            save_checkpoint(ckpt_path, ckpt)
+
+            total_frames += n
+            print(f"{path}: {n} frames, {n / max(dt, 1e-9):.1f} FPS")
+    finally:
+        for w in writers:
+            w.close()
+        if cache is not None:
+            print(cache.summary())
+            cache.close()
+
+    elapsed = time.perf_counter() - t0
+    print(f"Total: {total_frames} frames in {elapsed:.1f}s "
+          f"({total_frames / max(elapsed, 1e-9):.1f} FPS)")
+
+if __name__ == "__main__":
+    main()
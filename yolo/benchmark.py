@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import resource
+import runpy
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# End-to-end benchmark for the YOLO / eco scripts. Each pipeline script is run
+# unmodified in its own process with the camera replaced by a recorded video
+# and the window calls turned into no-ops, while the stage entry points are
+# wrapped with timers:
+#
+#   decode     cap.read()
+#   inference  model(...)
+#   tracking   MultiObjectTracker.update
+#   scoring    eco_scoring.score_boxes
+#   draw       cv2 drawing primitives
+#   display    cv2.imshow / cv2.waitKey
+#
+#   python benchmark.py --video traffic.mp4 --out bench.json
+#   python benchmark.py --video traffic.mp4 --baseline bench.json --max-regression 0.1
+#
+# Use --realtime for eco_indc_ui with PIPELINED on: its capture thread would
+# otherwise drain the file as fast as it decodes and skip most frames.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PIPELINES = {
+    "eco_indc_ui": "eco_indc_ui.py",
+    "ecological_indicator": "ecological_indicator.py",
+    "eco_indicator_2": "eco_indicator_2.py",
+    "yolo_webcam_detection": "yolo_webcam_detection.py",
+}
+
+DRAW_CALLS = ("rectangle", "putText", "getTextSize", "line", "polylines",
+              "ellipse", "circle", "addWeighted", "copyTo")
+
+# ---------- TIMERS ----------
+
+class StageTimes:
+
+    def __init__(self):
+        self.times = defaultdict(list)
+
+    def wrap(self, stage, fn):
+        times = self.times[stage]
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                times.append(time.perf_counter() - t0)
+
+        return timed
+
+# Stands in for cv2.VideoCapture(0). With realtime=True reads are paced at
+# the video's frame rate like a live camera; otherwise frames come as fast as
+# they decode.
+class FixtureCapture:
+
+    def __init__(self, path, limit, timer, realtime=False):
+        import cv2
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise SystemExit(f"cannot open fixture {path}")
+        self.limit = limit
+        self.pace = 1 / (self.cap.get(cv2.CAP_PROP_FPS) or 30) if realtime else 0.0
+        self.next_t = None
+        self.read_times = []
+        self._read = timer.wrap("decode", self.cap.read)
+
+    def read(self):
+        if self.limit and len(self.read_times) >= self.limit:
+            return False, None
+
+        if self.pace:
+            now = time.perf_counter()
+            self.next_t = now if self.next_t is None else self.next_t + self.pace
+            time.sleep(max(0.0, self.next_t - now))
+
+        self.read_times.append(time.perf_counter())
+        return self._read()
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+class TimedModel:
+
+    def __init__(self, model, timer):
+        self._model = model
+        self._call = timer.wrap("inference", model.__call__)
+
+    def __call__(self, *args, **kwargs):
+        return self._call(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+# ---------- WORKER ----------
+
+# Runs inside the child process: patch, run the script, report JSON on stdout.
+def run_worker(pipeline, video, frames, warmup, realtime):
+    import cv2
+    import backends
+    import eco_scoring
+    import tracking
+
+    timer = StageTimes()
+    shown = []
+
+    fixture = FixtureCapture(video, frames, timer, realtime)
+    cv2.VideoCapture = lambda *args, **kwargs: fixture
+
+    load_model = backends.load_model
+    backends.load_model = lambda *a, **k: TimedModel(load_model(*a, **k), timer)
+
+    eco_scoring.score_boxes = timer.wrap("scoring", eco_scoring.score_boxes)
+    tracking.MultiObjectTracker.update = timer.wrap("tracking", tracking.MultiObjectTracker.update)
+
+    for name in DRAW_CALLS:
+        setattr(cv2, name, timer.wrap("draw", getattr(cv2, name)))
+
+    def imshow(*args):
+        shown.append(time.perf_counter())
+
+    cv2.imshow = timer.wrap("display", imshow)
+    cv2.waitKey = timer.wrap("display", lambda *args: -1)
+    cv2.destroyAllWindows = lambda: None
+
+    # scripts stop after printing; keep their output off our JSON channel
+    real_stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        runpy.run_path(os.path.join(HERE, PIPELINES[pipeline]), run_name="__main__")
+    finally:
+        sys.stdout = real_stdout
+
+    # frame latency: read start of the newest frame -> imshow of it
+    reads = np.array(fixture.read_times)
+    shown = np.array(shown)
+    idx = np.searchsorted(reads, shown, side="right") - 1
+    latency = (shown - reads[np.clip(idx, 0, None)])[warmup:] * 1000
+
+    wall = shown[-1] - shown[min(warmup, len(shown) - 1)] if len(shown) > 1 else 0.0
+    n = max(len(shown) - warmup - 1, 0)
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+    report = {
+        "frames": len(shown),
+        "fps": n / wall if wall > 0 else 0.0,
+        "latency_ms": {
+            "p50": float(np.percentile(latency, 50)) if len(latency) else 0.0,
+            "p95": float(np.percentile(latency, 95)) if len(latency) else 0.0,
+            "p99": float(np.percentile(latency, 99)) if len(latency) else 0.0,
+        },
+        "stages_ms": {
+            stage: {
+                "calls": len(t),
+                "total": float(np.sum(t) * 1000),
+                "per_frame": float(np.sum(t) * 1000 / max(len(shown), 1)),
+            }
+            for stage, t in timer.times.items()
+        },
+        "peak_rss_mb": round(rss_mb, 1),
+    }
+    print(json.dumps(report))
+
+# ---------- HARNESS ----------
+
+def run_pipeline(pipeline, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", pipeline,
+           "--video", os.path.abspath(args.video),
+           "--frames", str(args.frames), "--warmup", str(args.warmup)]
+    if args.realtime:
+        cmd.append("--realtime")
+    out = subprocess.run(cmd, cwd=HERE, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def print_report(results):
+    for pipeline, r in results.items():
+        lat = r["latency_ms"]
+        print(f"\n{pipeline}: {r['fps']:.1f} FPS over {r['frames']} frames, "
+              f"latency p50 {lat['p50']:.1f} / p95 {lat['p95']:.1f} / p99 {lat['p99']:.1f} ms, "
+              f"peak RSS {r['peak_rss_mb']:.0f} MB")
+        for stage, s in sorted(r["stages_ms"].items(), key=lambda kv: -kv[1]["total"]):
+            print(f"  {stage:<10}{s['per_frame']:>9.2f} ms/frame  ({s['calls']} calls)")
+
+# Pipelines whose FPS fell more than max_regression below the baseline.
+def regressions(results, baseline, max_regression):
+    failed = []
+    for pipeline, r in results.items():
+        if pipeline in baseline:
+            old = baseline[pipeline]["fps"]
+            if old > 0 and r["fps"] < old * (1 - max_regression):
+                failed.append((pipeline, old, r["fps"]))
+    return failed
+
+def main():
+    ap = argparse.ArgumentParser(description="Headless benchmark of the YOLO / eco pipelines")
+    ap.add_argument("--video", required=True, help="recorded video fixture")
+    ap.add_argument("--pipelines", nargs="+", choices=sorted(PIPELINES), default=sorted(PIPELINES))
+    ap.add_argument("--frames", type=int, default=300, help="frames to replay (0 = whole video)")
+    ap.add_argument("--warmup", type=int, default=10, help="frames left out of the statistics")
+    ap.add_argument("--realtime", action="store_true",
+                    help="deliver frames at the video's frame rate like a camera")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--baseline", help="results JSON from an earlier run")
+    ap.add_argument("--max-regression", type=float, default=0.10,
+                    help="fail when FPS drops by more than this fraction")
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.video, args.frames, args.warmup, args.realtime)
+        return
+
+    results = {p: run_pipeline(p, args) for p in args.pipelines}
+    print_report(results)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        failed = regressions(results, baseline, args.max_regression)
+        for pipeline, old, new in failed:
+            print(f"REGRESSION {pipeline}: {old:.1f} -> {new:.1f} FPS")
+        if failed:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
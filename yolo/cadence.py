@@ -0,0 +1,81 @@
+import time
+
+import cv2
+import numpy as np
+
+# Run the detector only every N frames, or sooner when the scene changes,
+# and let the tracker carry boxes forward in between. N is adapted so the
+# loop holds a target frame rate.
+
+class AdaptiveCadence:
+
+    def __init__(self, target_fps=30, every=2, min_every=1, max_every=15,
+                 scene_threshold=12.0, thumb_size=(64, 36)):
+        self.target_fps = target_fps
+        self.every = every
+        self.min_every = min_every
+        self.max_every = max_every
+        self.scene_threshold = scene_threshold   # mean abs diff, 0-255
+        self.thumb_size = thumb_size
+
+        self.since = 0
+        self.ref = None
+        self.prev_t = None
+        self.period = None
+
+        self.frames = 0
+        self.detections = 0
+
+    def thumb(self, frame):
+        small = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    # Call once per frame; True means run the detector on this one.
+    def should_detect(self, frame):
+        self.frames += 1
+        self.tick()
+
+        small = self.thumb(frame)
+        changed = (self.ref is None or
+                   cv2.absdiff(small, self.ref).mean() > self.scene_threshold)
+
+        if changed or self.since + 1 >= self.every:
+            self.ref = small
+            self.since = 0
+            self.detections += 1
+            return True
+
+        self.since += 1
+        return False
+
+    # Smoothed loop period drives N: too slow -> detect less often,
+    # comfortably fast -> detect more often.
+    def tick(self):
+        now = time.perf_counter()
+        if self.prev_t is not None:
+            dt = now - self.prev_t
+            self.period = dt if self.period is None else 0.9 * self.period + 0.1 * dt
+        self.prev_t = now
+
+        if self.period is None:
+            return
+
+        fps = 1 / max(self.period, 1e-9)
+        if fps < 0.95 * self.target_fps and self.every < self.max_every:
+            self.every += 1
+            self.period = 1 / self.target_fps
+        elif fps > 1.2 * self.target_fps and self.every > self.min_every:
+            self.every -= 1
+            self.period = 1 / self.target_fps
+
+    def ratio(self):
+        return self.detections / max(self.frames, 1)
+
+# Boxes for a frame the detector skipped: the tracks matched or born at the
+# last detection, moved to `now` by their motion model and clipped to the
+# frame. Tracks already unmatched then are left out, not drawn as ghosts.
+def coast(tracker, now, w, h):
+    xyxy = tracker.predict(now)
+    seen = tracker.last_seen == tracker.last_update
+    xyxy = np.clip(xyxy[seen], 0, [w - 1, h - 1, w - 1, h - 1])
+    return xyxy, tracker.cls[seen], tracker.conf[seen], tracker.speeds()[seen]
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from eco_scoring import box_arrays
+
+# On-disk cache of raw detections, so re-scoring an archive after a CSV or
+# threshold change skips inference for everything seen before:
+#
+#   cache = DetectionCache("detections.sqlite", max_bytes=2 << 30)
+#   key = cache_key(content_hash(data), model_fingerprint("yolov8n.pt"),
+#                   {"conf": 0.25, "imgsz": 640})
+#   hit = cache.get_many([key]).get(key)      # (xyxy, cls, conf) or None
+#
+# The key covers the image content, the model file and the inference
+# parameters, so a changed model or threshold never returns stale boxes.
+# Everything lives in one SQLite file; when it outgrows max_bytes the least
+# recently used entries are evicted.
+
+# blake2b is faster than sha256 and 128 bits is plenty for a cache key.
+def content_hash(data):
+    return hashlib.blake2b(memoryview(data).cast("B"), digest_size=16).digest()
+
+_fingerprints = {}
+
+# Hash of a weights file (or of every file in an exported model folder),
+# memoized per path / mtime / size. A path that is not on disk (weights the
+# caller could not resolve) is hashed by name, so two such models still get
+# different fingerprints rather than the same empty one.
+def model_fingerprint(path):
+    if not os.path.exists(path):
+        return hashlib.blake2b(os.path.basename(path).encode(), digest_size=16).digest()
+
+    files = [path] if os.path.isfile(path) else sorted(
+        os.path.join(root, f) for root, _, names in os.walk(path) for f in names)
+
+    stamp = tuple((f, os.stat(f).st_mtime_ns, os.stat(f).st_size) for f in files)
+    if stamp not in _fingerprints:
+        h = hashlib.blake2b(digest_size=16)
+        for f in files:
+            with open(f, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b""):
+                    h.update(chunk)
+        _fingerprints[stamp] = h.digest()
+    return _fingerprints[stamp]
+
+def cache_key(content, model, params):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(content)
+    h.update(model)
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.digest()
+
+# ---------- SERIALIZATION ----------
+
+# n boxes -> xyxy (n*4 float32) + conf (n float32) + cls (n int32)
+def pack(xyxy, cls, conf):
+    return (np.ascontiguousarray(xyxy, dtype=np.float32).tobytes()
+            + np.ascontiguousarray(conf, dtype=np.float32).tobytes()
+            + np.ascontiguousarray(cls, dtype=np.int32).tobytes())
+
+def unpack(data):
+    n = len(data) // 24
+    xyxy = np.frombuffer(data, dtype=np.float32, count=n * 4).reshape(n, 4)
+    conf = np.frombuffer(data, dtype=np.float32, count=n, offset=n * 16)
+    cls = np.frombuffer(data, dtype=np.int32, count=n, offset=n * 20).astype(np.int64)
+    return xyxy, cls, conf
+
+# ---------- STORE ----------
+
+class DetectionCache:
+
+    def __init__(self, path, max_bytes=2 << 30):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS dets ("
+                        "key BLOB PRIMARY KEY, data BLOB, size INTEGER, used REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS dets_used ON dets(used)")
+
+        self.max_bytes = max_bytes
+        self.total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM dets").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    # {key: (xyxy, cls, conf)} for the keys present; marks them recently used.
+    def get_many(self, keys):
+        if not keys:
+            return {}
+
+        found = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = self.db.execute(f"SELECT key, data FROM dets WHERE key IN ({marks})", chunk)
+            found.update((bytes(k), unpack(d)) for k, d in rows)
+
+            if found:
+                self.db.execute(f"UPDATE dets SET used = ? WHERE key IN ({marks})",
+                                [time.time()] + chunk)
+
+        self.db.commit()
+        hits = sum(k in found for k in keys)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    # items: [(key, (xyxy, cls, conf)), ...]
+    def put_many(self, items):
+        if not items:
+            return
+
+        now = time.time()
+        rows = {}
+        for key, dets in items:
+            data = pack(*dets)
+            rows[key] = (key, data, len(data) + len(key), now)
+        rows = list(rows.values())
+
+        with self.db:
+            for key, *_ in rows:
+                old = self.db.execute("SELECT size FROM dets WHERE key = ?", (key,)).fetchone()
+                if old:
+                    self.total -= old[0]
+            self.db.executemany("INSERT OR REPLACE INTO dets VALUES (?, ?, ?, ?)", rows)
+            self.total += sum(r[2] for r in rows)
+
+        if self.total > self.max_bytes:
+            self.evict()
+
+    # Drop least recently used entries down to 90% of max_bytes.
+    def evict(self):
+        target = int(self.max_bytes * 0.9)
+        with self.db:
+            while self.total > target:
+                rows = self.db.execute(
+                    "SELECT key, size FROM dets ORDER BY used LIMIT 1000").fetchall()
+                if not rows:
+                    break
+                for key, size in rows:
+                    self.db.execute("DELETE FROM dets WHERE key = ?", (key,))
+                    self.total -= size
+                    self.evicted += 1
+                    if self.total <= target:
+                        break
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        return (f"cache: {self.hits}/{lookups} hits ({self.hits / max(lookups, 1) * 100:.0f}%), "
+                f"{self.total / (1 << 20):.1f} MB stored, {self.evicted} evicted")
+
+    def close(self):
+        self.db.close()
+
+# (xyxy, cls, conf) per image, running model() only on the cache misses
+# (all of them when cache is None). keys line up with images.
+def detect_batch(model, images, kwargs, cache=None, keys=None):
+    dets = [None] * len(images)
+    if cache is not None:
+        found = cache.get_many(keys)
+        dets = [found.get(k) for k in keys]
+
+    todo = [i for i, d in enumerate(dets) if d is None]
+    if todo:
+        results = model([images[i] for i in todo], **kwargs)
+        for i, res in zip(todo, results):
+            dets[i] = box_arrays(res)
+        if cache is not None:
+            cache.put_many([(keys[i], dets[i]) for i in todo])
+
+    return dets
@@ -0,0 +1,203 @@
+import json
+import os
+
+import numpy as np
+
+# Append-only columnar log of per-frame detections, cheap enough to leave
+# running:
+#
+#   log = DetectionLog("detlog", names=model.names)
+#   log.append(frame_idx, time.time(), xyxy, cls, conf, frame.shape, speed)
+#   log.close()
+#
+#   view = read_log("detlog")          # memory-mapped, nothing loaded
+#   xyxy, cls, conf = view.frame(1200)
+#
+# Every column is its own flat file of fixed-width values, written a chunk
+# of frames at a time:
+#
+#   frame_idx.i8  frame_t.f8  frame_end.i8        one value per frame
+#   box_xyxy.f4 (x4)  box_cls.i2  box_conf.f4
+#   box_speed.f4 (tracker px/s, NaN if not given)  one value per box
+#   meta.json                                      class names, frame size
+#
+# Logs written before speeds were logged have no box_speed: they read back
+# with NaN speeds, and a writer reopening one pads the column with NaN first.
+#
+# frame_end is the offset just past the frame's last box, so frame i owns
+# box_*[end[i - 1]:end[i]]. Boxes are flushed before the frames that point
+# at them, and a reopened log is trimmed back to the last frame whose boxes
+# are all on disk, so a crash never leaves frames pointing past the boxes.
+
+FRAME_COLUMNS = {"frame_idx": np.int64, "frame_t": np.float64, "frame_end": np.int64}
+BOX_COLUMNS = {"box_xyxy": np.float32, "box_cls": np.int16, "box_conf": np.float32,
+               "box_speed": np.float32}
+WIDTH = {"box_xyxy": 4}
+
+# Box columns older logs may not have
+OPTIONAL = ("box_speed",)
+
+def column_path(path, name):
+    return os.path.join(path, f"{name}.{np.dtype({**FRAME_COLUMNS, **BOX_COLUMNS}[name]).str[1:]}")
+
+def column_length(path, name):
+    p = column_path(path, name)
+    if not os.path.exists(p):
+        return 0
+    itemsize = np.dtype({**FRAME_COLUMNS, **BOX_COLUMNS}[name]).itemsize * WIDTH.get(name, 1)
+    return os.path.getsize(p) // itemsize
+
+def box_length(path):
+    return min(column_length(path, name) for name in BOX_COLUMNS
+               if name not in OPTIONAL or os.path.exists(column_path(path, name)))
+
+# ---------- WRITER ----------
+
+class DetectionLog:
+
+    def __init__(self, path, names=None, chunk_frames=256):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.chunk_frames = chunk_frames
+
+        self.meta_path = os.path.join(path, "meta.json")
+        self.meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+        if names is not None:
+            self.meta["names"] = {int(k): v for k, v in dict(names).items()}
+        self.write_meta()
+
+        self.n_frames, self.n_boxes = self.recover()
+
+        self.files = {name: open(column_path(path, name), "ab")
+                      for name in {**FRAME_COLUMNS, **BOX_COLUMNS}}
+        self.pending = []
+
+    # Trim every column to the last frame whose boxes are all on disk.
+    def recover(self):
+        n_frames = min(column_length(self.path, name) for name in FRAME_COLUMNS)
+        n_boxes = box_length(self.path)
+
+        ends = np.fromfile(column_path(self.path, "frame_end"), dtype=np.int64, count=n_frames) \
+            if n_frames else np.zeros(0, dtype=np.int64)
+        n_frames = int(np.searchsorted(ends, n_boxes, side="right"))
+        n_boxes = int(ends[n_frames - 1]) if n_frames else 0
+
+        for name in FRAME_COLUMNS:
+            self.truncate(name, n_frames)
+        for name in BOX_COLUMNS:
+            self.truncate(name, n_boxes)
+        for name in OPTIONAL:
+            missing = n_boxes - column_length(self.path, name)
+            if missing > 0:
+                with open(column_path(self.path, name), "ab") as f:
+                    f.write(np.full(missing, np.nan, dtype=BOX_COLUMNS[name]).tobytes())
+        return n_frames, n_boxes
+
+    def truncate(self, name, n):
+        p = column_path(self.path, name)
+        if os.path.exists(p):
+            itemsize = np.dtype({**FRAME_COLUMNS, **BOX_COLUMNS}[name]).itemsize * WIDTH.get(name, 1)
+            os.truncate(p, n * itemsize)
+
+    # Readers need names and frame size while the log is still being written.
+    def write_meta(self):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def append(self, frame_idx, t, xyxy, cls, conf, shape=None, speed=None):
+        if shape is not None and "width" not in self.meta:
+            self.meta["height"], self.meta["width"] = (int(v) for v in shape[:2])
+            self.write_meta()
+        cls = np.asarray(cls)
+        speed = np.full(len(cls), np.nan) if speed is None else np.asarray(speed)
+        self.pending.append((frame_idx, t, np.asarray(xyxy), cls, np.asarray(conf), speed))
+        if len(self.pending) >= self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        counts = np.array([len(p[3]) for p in self.pending], dtype=np.int64)
+        ends = self.n_boxes + np.cumsum(counts)
+
+        columns = {
+            "box_xyxy": np.concatenate([p[2].reshape(-1, 4) for p in self.pending]),
+            "box_cls": np.concatenate([p[3] for p in self.pending]),
+            "box_conf": np.concatenate([p[4] for p in self.pending]),
+            "box_speed": np.concatenate([p[5] for p in self.pending]),
+            "frame_idx": np.array([p[0] for p in self.pending]),
+            "frame_t": np.array([p[1] for p in self.pending]),
+            "frame_end": ends,
+        }
+
+        # boxes first, so frames never point past them
+        for name in (*BOX_COLUMNS, *FRAME_COLUMNS):
+            dtype = {**FRAME_COLUMNS, **BOX_COLUMNS}[name]
+            self.files[name].write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        for name in (*BOX_COLUMNS, *FRAME_COLUMNS):
+            self.files[name].flush()
+
+        self.n_boxes += int(counts.sum())
+        self.n_frames += len(self.pending)
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+
+# ---------- READER ----------
+
+class LogView:
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.names = {int(k): v for k, v in self.meta.get("names", {}).items()}
+
+        def mmap(name, n):
+            dtype = {**FRAME_COLUMNS, **BOX_COLUMNS}[name]
+            shape = (n, WIDTH[name]) if name in WIDTH else (n,)
+            if n == 0:
+                return np.zeros(shape, dtype=dtype)
+            return np.memmap(column_path(path, name), dtype=dtype, mode="r", shape=shape)
+
+        # a log still being written may hold boxes of frames not flushed yet
+        n_frames = min(column_length(path, name) for name in FRAME_COLUMNS)
+        n_boxes = box_length(path)
+
+        self.end = mmap("frame_end", n_frames)
+        n_frames = int(np.searchsorted(self.end, n_boxes, side="right"))
+        n_boxes = int(self.end[n_frames - 1]) if n_frames else 0
+
+        self.frame_idx = mmap("frame_idx", n_frames)
+        self.t = mmap("frame_t", n_frames)
+        self.end = self.end[:n_frames]
+        self.start = np.concatenate(([0], self.end[:-1]))[:n_frames].astype(np.int64)
+        self.xyxy = mmap("box_xyxy", n_boxes)
+        self.cls = mmap("box_cls", n_boxes)
+        self.conf = mmap("box_conf", n_boxes)
+        if os.path.exists(column_path(path, "box_speed")):
+            self.speed = mmap("box_speed", n_boxes)
+        else:
+            self.speed = np.full(n_boxes, np.nan, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.end)
+
+    def frame(self, i):
+        a, b = self.start[i], self.end[i]
+        return self.xyxy[a:b], self.cls[a:b].astype(np.int64), self.conf[a:b]
+
+    # Frame number (row in the frame columns) of every box.
+    def box_frame(self):
+        return np.repeat(np.arange(len(self)), self.end - self.start)
+
+def read_log(path):
+    return LogView(path)
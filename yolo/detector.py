@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+
+from eco_scoring import box_arrays, box_geometry
+from cadence import coast
+
+# Per-frame boxes for the eco scripts. Wraps model(frame) with the optional
+# motion gate (static scene -> reuse last detections) and adaptive cadence
+# (skipped frame -> tracker prediction), and feeds everything through the
+# tracker so speeds stay per object. With a tiling.Tiler the frame is
+# detected as a batch of overlapping tiles instead of one downscaled image.
+# With a qos.ImgszController the input size follows the measured latency.
+
+class Detector:
+
+    def __init__(self, model, tracker, conf=None, cadence=None, gate=None, tiler=None, qos=None):
+        self.model = model
+        self.tracker = tracker
+        self.conf = conf
+        self.cadence = cadence
+        self.gate = gate
+        self.tiler = tiler
+        self.qos = qos
+
+        self.last = (np.zeros((0, 4), dtype=np.float32),
+                     np.zeros(0, dtype=np.int64),
+                     np.zeros(0, dtype=np.float32))
+
+    def infer(self, frame):
+        kwargs = {} if self.conf is None else {"conf": self.conf}
+
+        # tiles are always TILE_SIZE, so the controller only drives full frames
+        qos = self.qos if self.tiler is None else None
+        if qos is not None:
+            kwargs["imgsz"] = qos.imgsz
+
+        t0 = time.perf_counter()
+        if self.tiler is not None:
+            boxes = self.tiler(self.model, frame, **kwargs)
+        else:
+            boxes = box_arrays(self.model(frame, **kwargs)[0])
+        dt = time.perf_counter() - t0
+
+        if self.gate is not None:
+            self.gate.record_inference(dt)
+        if qos is not None:
+            qos.record(dt)
+
+        return boxes
+
+    # Returns integer xyxy, class ids, confidences, area ratios and speeds
+    # (px/s) for the frame captured at `now`.
+    def __call__(self, frame, now):
+        h, w = frame.shape[:2]
+
+        if self.gate is not None and not self.gate.moving(frame):
+            # static scene: same boxes as last time
+            xyxy, cls, conf = self.last
+            _, speed = self.tracker.update(xyxy, cls, now, conf)
+
+        elif self.cadence is None or self.cadence.should_detect(frame):
+            xyxy, cls, conf = self.last = self.infer(frame)
+            _, speed = self.tracker.update(xyxy, cls, now, conf)
+
+        else:
+            # detector skipped: boxes carried forward by the tracker
+            xyxy, cls, conf, speed = coast(self.tracker, now, w, h)
+
+        xy, _, area = box_geometry(xyxy, w, h)
+        return xy, cls, conf, area, speed
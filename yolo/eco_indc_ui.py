@@ -2,42 +2,97 @@ import cv2
 import numpy as np
 import time
 import math
-from ultralytics import YOLO
-from collections import defaultdict, deque
+import os
+import sys
+import signal
+import threading
+import queue
+from collections import deque
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from profiling import profiler
+
+from backends import load_model
+from eco_scoring import LINEAR_SCORES, class_table, score_boxes
+from tracking import MultiObjectTracker
+from cadence import AdaptiveCadence
+from motion_gate import MotionGate
+from detector import Detector
+from tiling import Tiler
+from qos import ImgszController
+from parser import EmissionTable
+from hud import HudLayers
+from eco_store import EcoStore
+from metrics import MetricsServer
+from recorder import Recorder
+from pipeline import LatestQueue, CaptureStage, Stage, InlineStage, stage_stats
 
 MODEL_NAME = "yolov8n.pt"
 CONFIDENCE_THRESHOLD = 0.35
 
-# ECOLOGICAL IMPACT SCALE (0–100 normalized)
-# RESEARCH EMISSION DATASET (Derived from DEFRA/EPA/IPCC/OpenLCA)
-# Units: normalized CO2 intensity
-
-eco_scores = {
-    "car": 90, "truck": 100, "bus": 85,
-    "motorcycle": 60, "cow": 95,
-    "cell phone": 40, "laptop": 45, "tv": 50,
-    "keyboard": 25, "mouse": 20,
-    "bottle": 25, "cup": 15,
-    "chair": 10, "bench": 12,
-    "person": 5, "dog": 3, "bicycle": 5,
-    "__default__": 10
-}
+# Inference backend: "torch", "onnx", "onnx-int8", "openvino", "openvino-int8"
+# (exported and cached next to the weights on first use; the -int8 ones
+# calibrate on the sample frames in CALIB_DIR)
+BACKEND = "torch"
+CALIB_DIR = None
+
+# Run capture / inference / render on separate threads
+PIPELINED = True
+
+# Detect every N frames (N adapted to hold TARGET_FPS, or sooner on a scene
+# change) and carry boxes forward with the tracker in between
+ADAPTIVE_CADENCE = False
+TARGET_FPS = 30
+
+# Skip inference while the scene is static and reuse the last detections
+MOTION_GATE = False
+
+# Detect on overlapping TILE_SIZE crops batched together (for 4K cameras
+# where small objects vanish at the default input size); TILE_MOTION_ONLY
+# re-runs only the tiles with motion
+TILED = False
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2
+TILE_MOTION_ONLY = False
+
+# Move the model input size between QOS_SIZES so inference holds TARGET_FPS
+# (torch backend only: exported models have a fixed input size)
+QOS = False
+QOS_SIZES = (320, 416, 640)
+
+# ECOLOGICAL IMPACT SCALE (0–100 normalized), from eco_scoring so the
+# headless tools score with the same table
+eco_scores = LINEAR_SCORES
 
 MIN_SIZE_FACTOR = 0.6
 MAX_SIZE_FACTOR = 2.0
 MOTION_SAT = 30
 MAX_FRAME_IMPACT = 500
 
-def get_score(cls):
-    return eco_scores.get(cls, eco_scores["__default__"])
+# Score from the emission CSV instead of the table above; edits to the CSV
+# are picked up while running (e.g. "emission_dataset.csv")
+EMISSION_CSV = None
+
+# Persist eco index / impact / class contributions to a memory-mapped store in
+# this folder (e.g. "eco_store"); 't' then switches the trend between recent
+# frames and minute / hour means
+ECO_STORE = None
+TREND_VIEWS = ("frames", "minute", "hour")
+
+# Run without windows or drawing (display-less servers); stop with Ctrl+C
+HEADLESS = False
 
-def size_factor(area_ratio):
-    r = min(area_ratio, 0.25)
-    return MIN_SIZE_FACTOR + (MAX_SIZE_FACTOR - MIN_SIZE_FACTOR) * (r / 0.25)
+# Serve eco index, class contributions, FPS and stage latencies in Prometheus
+# text format on this local port (e.g. 9108)
+METRICS_PORT = None
 
-def motion_factor(speed):
-    s = min(speed, MOTION_SAT)
-    return 1.0 + (s / MOTION_SAT)
+# Record the annotated stream to segmented video files in this folder (e.g.
+# "recordings"), starting a new file every RECORD_SEGMENT_SECONDS and/or
+# RECORD_SEGMENT_MB
+RECORD_DIR = None
+RECORD_SEGMENT_SECONDS = 600
+RECORD_SEGMENT_MB = None
 
 def eco_color(score):
     if score < 20: return (0,200,0)
@@ -49,167 +104,300 @@ def normalize(total):
     val = 100 * (1 - total / MAX_FRAME_IMPACT)
     return max(0, min(100, val))
 
-# ---------- TRACKER ----------
-
-class Tracker:
-    def __init__(self):
-        self.prev = {}
-
-    def speed(self, key, cx, cy):
-        now = time.time()
-        if key in self.prev:
-            px, py, pt = self.prev[key]
-            dt = now - pt
-            v = np.hypot(cx-px, cy-py) / dt if dt > 0 else 0
-        else:
-            v = 0
-        self.prev[key] = (cx, cy, now)
-        return v/30
-
 # ---------- NEW FEATURES ----------
 
 eco_history = deque(maxlen=120)
-class_contrib = defaultdict(float)
+hud = HudLayers(eco_color, eco_history.maxlen)
+class_contrib = np.zeros(0)
 session_total = 0
 debug = False
+trend_view = 0
+frames = 0
+
+# ---------- SCORING + DRAWING ----------
+
+@profiler.timed("score_frame")
+def score_frame(frame, ts):
+    xy, cls, conf, area, speed = detector(frame, ts)
+    speed = speed / 30
+
+    return score_boxes(
+        xy, cls, conf, area, speed,
+        emissions.current() if emissions is not None else score_table,
+        min_size_factor=MIN_SIZE_FACTOR,
+        max_size_factor=MAX_SIZE_FACTOR,
+        motion_sat=MOTION_SAT
+    )
+
+@profiler.timed("draw")
+def draw_boxes(frame, scored):
+    for (x1,y1,x2,y2), c, base, s, m, impact in zip(
+            scored.xyxy.tolist(), scored.cls.tolist(), scored.base.tolist(),
+            scored.size.tolist(), scored.motion.tolist(), scored.impact.tolist()):
+
+        cls = names[c]
+        color = eco_color(base)
+
+        # Draw bounding box
+        cv2.rectangle(frame,(x1,y1),(x2,y2),color,2)
+
+        # ---------- NEW: LABEL WITH OBJECT + SCORE ----------
+        label = f"{cls} {impact:.1f}"
+
+        (tw, th), _ = cv2.getTextSize(
+            label,
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            2
+        )
+
+        # background box for text
+        cv2.rectangle(
+            frame,
+            (x1, y1 - th - 8),
+            (x1 + tw + 4, y1),
+            (0,0,0),
+            -1
+        )
+
+        # draw text
+        cv2.putText(
+            frame,
+            label,
+            (x1 + 2, y1 - 4),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (255,255,255),
+            2
+        )
+
+        if debug:
+            cv2.putText(frame,
+                f"S:{s:.2f} M:{m:.2f}",
+                (x1,y2+15),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.4,(255,255,255),1)
 
-def draw_gauge(img, value):
-    center = (550, 100)
-    radius = 60
-    angle = int(180 * value / 100)
+@profiler.timed("draw")
+def draw_hud(frame, eco, fps, extra=()):
+    # Top polluter
+    top = None
+    if class_contrib.any():
+        top = names[int(class_contrib.argmax())]
+
+    status = f"FPS: {fps:.1f}"
+    if cadence is not None:
+        status += f"  DET 1/{cadence.every} ({cadence.ratio()*100:.0f}%)"
+    if gate is not None:
+        status += f"  GATE {gate.hit_rate()*100:.0f}%"
+    if qos is not None:
+        status += f"  IMGSZ {qos.imgsz}"
+
+    history = eco_history
+    view = TREND_VIEWS[trend_view]
+    if view != "frames":
+        history = store.recent_rollups(view, eco_history.maxlen)["eco_mean"]
+        status += f"  TREND {view}"
+
+    hud.render(frame, eco, history, status, top, extra)
+
+def record(scored, eco):
+    global class_contrib, session_total, frames
+    class_contrib = scored.class_contrib
+    frames += 1
+    eco_history.append(eco)
+    session_total += scored.total
+    if store is not None:
+        store.append(time.time(), eco, scored.total, scored.class_contrib)
+
+def publish(eco, total, fps, stages):
+    if metrics is None:
+        return
+    metrics.publish(
+        eco_index=eco,
+        eco_total_impact=total,
+        eco_class_contribution={names[i]: class_contrib[i] for i in np.flatnonzero(class_contrib)},
+        fps=fps,
+        frames_total=frames,
+        stage_latency_seconds=stages,
+        imgsz=qos.imgsz if qos is not None else None,
+    )
+
+def handle_key(key):
+    global debug, trend_view
+    if key == ord('d'): debug = not debug
+    if key == ord('t') and store is not None:
+        trend_view = (trend_view + 1) % len(TREND_VIEWS)
 
-    cv2.ellipse(img, center, (radius, radius), 0, 180, 0, (60,60,60), 10)
-    cv2.ellipse(img, center, (radius, radius), 0, 180, 180-angle, eco_color(100-value), 10)
+# ---------- MAIN ----------
 
-    cv2.putText(img, f"{value:.1f}",
-        (center[0]-30, center[1]+10),
-        cv2.FONT_HERSHEY_SIMPLEX, 0.8,
-        (255,255,255), 2)
+model = load_model(BACKEND, MODEL_NAME, calib_dir=CALIB_DIR)
+names = model.names
+score_table = class_table(eco_scores, names)
+emissions = EmissionTable(EMISSION_CSV, names) if EMISSION_CSV else None
+tracker = MultiObjectTracker()
+cadence = AdaptiveCadence(TARGET_FPS) if ADAPTIVE_CADENCE else None
+gate = MotionGate() if MOTION_GATE else None
+tiler = Tiler(TILE_SIZE, TILE_OVERLAP, motion_only=TILE_MOTION_ONLY) if TILED else None
+if QOS and BACKEND != "torch":
+    print(f"QOS disabled: the {BACKEND} export is built for one input size")
+    QOS = False
+qos = ImgszController(QOS_SIZES, TARGET_FPS) if QOS else None
+detector = Detector(profiler.wrap(model, "model"), tracker, CONFIDENCE_THRESHOLD, cadence, gate, tiler, qos)
+score_boxes = profiler.wrap(score_boxes, "scoring")
+store = EcoStore(ECO_STORE, len(names)) if ECO_STORE else None
+metrics = MetricsServer(METRICS_PORT, prefix="eco_indc_") if METRICS_PORT else None
+cap = cv2.VideoCapture(0)
 
-def draw_trend(img):
-    if len(eco_history) < 2: return
+# Ctrl+C ends the headless loop cleanly
+stop = threading.Event()
+if HEADLESS:
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
 
-    for i in range(1, len(eco_history)):
-        x1 = 50 + (i-1)*2
-        x2 = 50 + i*2
-        y1 = 300 - int(eco_history[i-1])
-        y2 = 300 - int(eco_history[i])
-        cv2.line(img, (x1,y1), (x2,y2), (0,255,0), 2)
+recorder = Recorder.from_config(RECORD_DIR, RECORD_SEGMENT_SECONDS, RECORD_SEGMENT_MB)
+read_frame = profiler.wrap(cap.read, "capture")
 
-# ---------- MAIN ----------
+prev_time = time.time()
 
-model = YOLO(MODEL_NAME)
-tracker = Tracker()
-names = model.model.names
-cap = cv2.VideoCapture(0)
+def run_sequential():
+    global prev_time
 
-prev_time = time.time()
+    while not stop.is_set():
 
-while True:
+        ret, frame = read_frame()
+        if not ret: break
 
-    ret, frame = cap.read()
-    if not ret: break
+        t0 = time.perf_counter()
+        scored = score_frame(frame, time.time())
+        infer_time = time.perf_counter() - t0
 
-    h, w = frame.shape[:2]
-    results = model(frame, conf=CONFIDENCE_THRESHOLD)[0]
+        eco = normalize(scored.total)
+        record(scored, eco)
 
-    total_impact = 0
-    class_contrib.clear()
+        # FPS
+        now = time.time()
+        fps = 1/(now-prev_time)
+        prev_time = now
 
-    if results.boxes is not None:
-        for box in results.boxes:
+        publish(eco, scored.total, fps, {"inference": infer_time})
 
-            x1,y1,x2,y2 = map(int, box.xyxy[0])
-            cls = names[int(box.cls[0])]
+        if HEADLESS:
+            continue
 
-            cx, cy = (x1+x2)//2, (y1+y2)//2
-            area = ((x2-x1)*(y2-y1))/(w*h)
+        # ---------- UI ----------
 
-            base = get_score(cls)
-            s = size_factor(area)
-            m = motion_factor(tracker.speed(cls,cx,cy))
+        draw_boxes(frame, scored)
+        draw_hud(frame, eco, fps)
 
-            impact = base*s*m
-            total_impact += impact
-            class_contrib[cls] += impact
+        if recorder is not None:
+            recorder.write(frame)
 
-            color = eco_color(base)
+        with profiler.span("display"):
+            cv2.imshow("Ecological Indicator Pro",frame)
+            key = cv2.waitKey(1)
+        if key == 27: break
+        handle_key(key)
 
-            # Draw bounding box
-            cv2.rectangle(frame,(x1,y1),(x2,y2),color,2)
+# Capture and inference run on their own threads; the main thread renders the
+# newest camera frame with the newest scored detections, so display runs at
+# camera rate and the overlay trails by at most one inference.
+def run_pipelined():
+    global prev_time
 
-            # ---------- NEW: LABEL WITH OBJECT + SCORE ----------
-            label = f"{cls} {impact:.1f}"
+    infer_q = LatestQueue(1)
+    display_q = LatestQueue(1)
+    scored_q = LatestQueue(1)
 
-            (tw, th), _ = cv2.getTextSize(
-                label,
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                2
-            )
-
-            # background box for text
-            cv2.rectangle(
-                frame,
-                (x1, y1 - th - 8),
-                (x1 + tw + 4, y1),
-                (0,0,0),
-                -1
-            )
-
-            # draw text
-            cv2.putText(
-                frame,
-                label,
-                (x1 + 2, y1 - 4),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (255,255,255),
-                2
-            )
+    def infer(item):
+        idx, ts, frame = item
+        return idx, score_frame(frame, ts)
+
+    capture = CaptureStage(SimpleNamespace(read=read_frame), [infer_q, display_q], stop)
+    inference = Stage("inference", infer, infer_q, scored_q, stop)
+    render = InlineStage()
+
+    capture.start()
+    inference.start()
+
+    scored, eco = None, normalize(0)
+
+    try:
+        while not stop.is_set():
+
+            try:
+                idx, ts, frame = display_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
 
+            t0 = time.perf_counter()
+
+            result = scored_q.poll()
+            if result is not None:
+                _, scored = result
+                eco = normalize(scored.total)
+                record(scored, eco)
+
+            now = time.time()
+            fps = 1/(now-prev_time)
+            prev_time = now
+
+            publish(eco, scored.total if scored is not None else 0.0, fps, {
+                "capture": capture.latency,
+                "inference": inference.latency,
+                "render": render.latency,
+            })
+
+            if HEADLESS:
+                render.record(t0)
+                continue
+
+            if scored is not None:
+                draw_boxes(frame, scored)
+
+            extra = ()
             if debug:
-                cv2.putText(frame,
-                    f"S:{s:.2f} M:{m:.2f}",
-                    (x1,y2+15),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.4,(255,255,255),1)
+                extra = stage_stats([
+                    ("capture", capture, None),
+                    ("inference", inference, infer_q),
+                    ("render", render, display_q),
+                ])
 
-    eco = normalize(total_impact)
-    eco_history.append(eco)
-    session_total += total_impact
+            draw_hud(frame, eco, fps, extra)
 
-    # ---------- UI ----------
+            if recorder is not None:
+                recorder.write(frame)
 
-    cv2.rectangle(frame,(10,10),(300,110),(30,30,30),-1)
-    cv2.putText(frame,f"ECO INDEX: {eco:.1f}",
-        (20,50),cv2.FONT_HERSHEY_SIMPLEX,1,
-        eco_color(100-eco),3)
+            with profiler.span("display"):
+                cv2.imshow("Ecological Indicator Pro",frame)
+                render.record(t0)
+                key = cv2.waitKey(1)
+            if key == 27: break
+            handle_key(key)
+    finally:
+        stop.set()
+        capture.join(timeout=1.0)
+        inference.join(timeout=1.0)
 
-    draw_gauge(frame, eco)
-    draw_trend(frame)
+if PIPELINED:
+    run_pipelined()
+else:
+    run_sequential()
 
-    # Top polluter
-    if class_contrib:
-        worst = max(class_contrib, key=class_contrib.get)
-        cv2.putText(frame,f"Top impact: {worst}",
-            (20,140),cv2.FONT_HERSHEY_SIMPLEX,
-            0.6,(0,255,255),2)
+if gate is not None:
+    print(gate.summary())
 
-    # FPS
-    now = time.time()
-    fps = 1/(now-prev_time)
-    prev_time = now
+if tiler is not None:
+    print(tiler.summary())
 
-    cv2.putText(frame,f"FPS: {fps:.1f}",
-        (20,170),cv2.FONT_HERSHEY_SIMPLEX,
-        0.5,(255,255,255),1)
+if store is not None:
+    store.close()
 
-    cv2.imshow("Ecological Indicator Pro",frame)
+if recorder is not None:
+    recorder.close()
 
-    key = cv2.waitKey(1)
-    if key == 27: break
-    if key == ord('d'): debug = not debug
+if metrics is not None:
+    metrics.close()
 
 cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+if not HEADLESS:
+    cv2.destroyAllWindows()
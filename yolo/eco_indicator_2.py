@@ -2,43 +2,31 @@ import cv2
 import numpy as np
 import time
 import math
-from ultralytics import YOLO
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from profiling import profiler
+
+from backends import load_model
+from eco_scoring import HYBRID_EMISSIONS, class_table, score_boxes
+from tracking import MultiObjectTracker
+from cadence import AdaptiveCadence
+from motion_gate import MotionGate
+from detector import Detector
+from tiling import Tiler
+from qos import ImgszController
+from parser import EmissionTable
+from recorder import Recorder
+from det_log import DetectionLog
+from replay import Replay, sweep
 
 # -----------------------------
 # RESEARCH EMISSION DATASET
-# (Derived from DEFRA/EPA/IPCC/OpenLCA)
-# Units: normalized CO2 intensity
+# (eco_scoring.HYBRID_EMISSIONS, shared with the headless tools)
 # -----------------------------
 
-RAW_EMISSIONS = {
-
-    # Very high impact
-    "car": 90,
-    "truck": 100,
-    "bus": 85,
-    "motorcycle": 60,
-    "cow": 95,
-
-    # Electronics (mapped to closest YOLO classes)
-    "cell phone": 45,
-    "laptop": 50,
-    "tv": 55,
-    "keyboard": 25,
-    "mouse": 20,
-
-    # Plastics
-    "bottle": 25,
-    "cup": 15,
-    "chair": 25,
-    "bench": 30,
-
-    # Low impact
-    "person": 5,
-    "dog": 3,
-    "bicycle": 5,
-
-    "__default__": 10
-}
+RAW_EMISSIONS = HYBRID_EMISSIONS
 
 def normalize_emissions(raw):
 
@@ -58,34 +46,53 @@ ALPHA = 1.2
 BETA = 0.8
 MAX_IMPACT = 25
 
+# Score from the emission CSV instead of the RAW_EMISSIONS table; edits to the CSV
+# are picked up while running (e.g. "emission_dataset.csv")
+EMISSION_CSV = None
+
+# Detect every N frames (N adapted to hold TARGET_FPS, or sooner on a scene
+# change) and carry boxes forward with the tracker in between
+ADAPTIVE_CADENCE = False
+TARGET_FPS = 30
+
+# Skip inference while the scene is static and reuse the last detections
+MOTION_GATE = False
+
+# Detect on overlapping TILE_SIZE crops batched together (for 4K cameras
+# where small objects vanish at the default input size); TILE_MOTION_ONLY
+# re-runs only the tiles with motion
+TILED = False
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2
+TILE_MOTION_ONLY = False
+
+# Move the model input size between QOS_SIZES so inference holds TARGET_FPS
+# (torch backend only: exported models have a fixed input size)
+QOS = False
+QOS_SIZES = (320, 416, 640)
+
+# Record the annotated stream to segmented video files in this folder (e.g.
+# "recordings"), starting a new file every RECORD_SEGMENT_SECONDS and/or
+# RECORD_SEGMENT_MB
+RECORD_DIR = None
+RECORD_SEGMENT_SECONDS = 600
+RECORD_SEGMENT_MB = None
+
+# Append every frame's boxes (frame index, time, xyxy, class, confidence,
+# tracker speed) to a columnar detection log in this folder (e.g. "detlog"),
+# for re-scoring and audits without keeping the video; read it back with
+# det_log.read_log, sweep scoring parameters over it with replay.py
+DETECTION_LOG = None
+
+# Inference backend: "torch", "onnx", "onnx-int8", "openvino", "openvino-int8"
+# (exported and cached next to the weights on first use; the -int8 ones
+# calibrate on the sample frames in CALIB_DIR)
+BACKEND = "torch"
+CALIB_DIR = None
+
 def emission(cls):
     return EMISSIONS.get(cls, EMISSIONS["__default__"])
 
-# -----------------------------
-# TRACKER
-# -----------------------------
-
-class Tracker:
-
-    def __init__(self):
-        self.prev = {}
-
-    def speed(self, key, cx, cy):
-
-        now = time.time()
-
-        if key in self.prev:
-            px, py, pt = self.prev[key]
-            dt = now - pt
-            v = np.hypot(cx - px, cy - py) / max(dt, 1e-6)
-        else:
-            v = 0
-
-        self.prev[key] = (cx, cy, now)
-        return v
-
-tracker = Tracker()
-
 # -----------------------------
 # ECO INDEX
 # -----------------------------
@@ -122,79 +129,126 @@ def eco_color(score):
 # SENSITIVITY ANALYSIS
 # -----------------------------
 
-def sensitivity_report(total):
+# Eco index over the frames in DETECTION_LOG with ALPHA, BETA and MAX_IMPACT
+# each scaled by SENSITIVITY_STEPS (the other two held), replayed from the
+# logged boxes; printed at exit. For full grids use replay.py.
+SENSITIVITY_STEPS = np.array([0.5, 0.75, 1.0, 1.25, 1.5])
+
+def sensitivity_report(log_path, table):
+
+    replay = Replay(log_path)
+    if not len(replay):
+        return
 
-    print("Impact:", round(total,3))
-    print("Eco Index:", round(eco_index(total),2))
+    current = {"alpha": ALPHA, "beta": BETA, "max_impact": MAX_IMPACT}
+    print(f"Sensitivity over {len(replay)} logged frames (eco index mean / p5 / p50 / p95):")
+
+    for name, value in current.items():
+        result = sweep(replay, "hybrid", {name: value * SENSITIVITY_STEPS}, table, fixed=current)
+        for row in result.rows():
+            print(f"  {name:<10} {row[name]:7.2f}   "
+                  f"{row['mean']:5.1f} / {row['p5']:5.1f} / {row['p50']:5.1f} / {row['p95']:5.1f}")
 
 # -----------------------------
 # YOLO INIT
 # -----------------------------
 
-model = YOLO("yolov8n.pt")
-names = model.model.names
+model = load_model(BACKEND, "yolov8n.pt", calib_dir=CALIB_DIR)
+names = model.names
+
+# log-normalized emissions indexed by class id
+emission_table = class_table(EMISSIONS, names)
+emissions = EmissionTable(EMISSION_CSV, names, "log") if EMISSION_CSV else None
+tracker = MultiObjectTracker()
+cadence = AdaptiveCadence(TARGET_FPS) if ADAPTIVE_CADENCE else None
+gate = MotionGate() if MOTION_GATE else None
+tiler = Tiler(TILE_SIZE, TILE_OVERLAP, motion_only=TILE_MOTION_ONLY) if TILED else None
+if QOS and BACKEND != "torch":
+    print(f"QOS disabled: the {BACKEND} export is built for one input size")
+    QOS = False
+qos = ImgszController(QOS_SIZES, TARGET_FPS) if QOS else None
+detector = Detector(profiler.wrap(model, "model"), tracker, None, cadence, gate, tiler, qos)
+score_boxes = profiler.wrap(score_boxes, "scoring")
+
 cap = cv2.VideoCapture(0)
+recorder = Recorder.from_config(RECORD_DIR, RECORD_SEGMENT_SECONDS, RECORD_SEGMENT_MB)
+det_log = DetectionLog(DETECTION_LOG, names) if DETECTION_LOG else None
 
+frame_idx = 0
 while True:
 
-    ret, frame = cap.read()
+    with profiler.span("capture"):
+        ret, frame = cap.read()
     if not ret:
         break
 
-    h,w = frame.shape[:2]
-
-    results = model(frame)[0]
-
-    total = 0
-
-    if results.boxes is not None:
-
-        for box in results.boxes:
-
-            x1,y1,x2,y2 = map(int, box.xyxy[0])
-            cls = names[int(box.cls[0])]
-
-            cx = (x1+x2)//2
-            cy = (y1+y2)//2
-
-            area = ((x2-x1)*(y2-y1))/(w*h)
-            speed = tracker.speed(cls, cx, cy)
-
-            S = min(area*4,1)
-            M = min(speed/600,1)
-
-            impact = emission(cls)*(S**ALPHA)*(M**BETA)
+    now = time.time()
+    with profiler.span("detect"):
+        xy, cls, conf, area, speed = detector(frame, now)
+    if det_log is not None:
+        det_log.append(frame_idx, now, xy, cls, conf, frame.shape, speed)
+    frame_idx += 1
+
+    scored = score_boxes(
+        xy, cls, conf, area, speed,
+        emissions.current() if emissions is not None else emission_table,
+        model="hybrid", alpha=ALPHA, beta=BETA
+    )
+    total = scored.total
+    eco = eco_index(total)
 
-            total += impact
+    with profiler.span("draw"):
+        for (x1, y1, x2, y2), c, impact in zip(
+                scored.xyxy.tolist(), scored.cls.tolist(), scored.impact.tolist()):
 
             color = eco_color(impact*20)
 
             cv2.rectangle(frame,(x1,y1),(x2,y2),color,3)
 
             cv2.putText(frame,
-                        f"{cls}:{impact:.2f}",
+                        f"{names[c]}:{impact:.2f}",
                         (x1,y1-5),
                         cv2.FONT_HERSHEY_SIMPLEX,
                         0.5,
                         color,
                         2)
 
-    eco = eco_index(total)
+        cv2.rectangle(frame,(10,10),(350,90),(30,30,30),-1)
+
+        cv2.putText(frame,
+                    f"ECO INDEX: {eco:.1f}",
+                    (20,55),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    1,
+                    eco_color(100-eco),
+                    3)
 
-    cv2.rectangle(frame,(10,10),(350,90),(30,30,30),-1)
+        if qos is not None:
+            cv2.putText(frame, f"IMGSZ {qos.imgsz}", (20,80),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255,255,255), 1)
 
-    cv2.putText(frame,
-                f"ECO INDEX: {eco:.1f}",
-                (20,55),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1,
-                eco_color(100-eco),
-                3)
+    if recorder is not None:
+        recorder.write(frame)
 
-    cv2.imshow("Research Eco Indicator",frame)
+    with profiler.span("display"):
+        cv2.imshow("Research Eco Indicator",frame)
+        key = cv2.waitKey(1)
 
-    if cv2.waitKey(1)==27:
+    if key==27:
         break
 
+if gate is not None:
+    print(gate.summary())
+
+if tiler is not None:
+    print(tiler.summary())
+
+if recorder is not None:
+    recorder.close()
+
+if det_log is not None:
+    det_log.close()
+    sensitivity_report(DETECTION_LOG, emissions.current() if emissions is not None else emission_table)
+
 cap.release()
 cv2.destroyAllWindows()
\ No newline at end of file
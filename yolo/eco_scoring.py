@@ -0,0 +1,159 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Whole-frame impact scoring on the raw YOLO box arrays. Every function works
+# on (N,) / (N,4) arrays so a crowded frame costs a handful of NumPy calls
+# instead of N trips through get_score / size_factor / motion_factor.
+
+FrameScore = namedtuple(
+    "FrameScore",
+    ["xyxy", "cls", "conf", "base", "size", "motion", "impact", "total", "class_contrib"]
+)
+
+# ---------- CLASS TABLES ----------
+
+# Turn a {class name: score} dict into an array indexed by YOLO class id.
+# Classes missing from the dict get the "__default__" score.
+def class_table(scores, names, transform=None):
+    n = max(names) + 1 if names else 0
+    table = np.full(n, scores["__default__"], dtype=np.float64)
+
+    for i, name in names.items():
+        if name in scores:
+            table[i] = scores[name]
+
+    if transform is not None:
+        table = transform(table)
+
+    return table
+
+# ---------- BOX ARRAYS ----------
+
+def box_arrays(results):
+    boxes = results.boxes
+    if boxes is None or len(boxes) == 0:
+        return (np.zeros((0, 4), dtype=np.float32),
+                np.zeros(0, dtype=np.int64),
+                np.zeros(0, dtype=np.float32))
+
+    xyxy = boxes.xyxy.cpu().numpy()
+    cls = boxes.cls.cpu().numpy().astype(np.int64)
+    conf = boxes.conf.cpu().numpy()
+    return xyxy, cls, conf
+
+# Integer corners (same truncation as map(int, ...)), centres and area as a
+# fraction of the frame.
+def box_geometry(xyxy, w, h):
+    xy = xyxy.astype(np.int64)
+    centers = np.stack(((xy[:, 0] + xy[:, 2]) // 2,
+                        (xy[:, 1] + xy[:, 3]) // 2), axis=1)
+    area = (xy[:, 2] - xy[:, 0]) * (xy[:, 3] - xy[:, 1]) / (w * h)
+    return xy, centers, area
+
+# ---------- IMPACT MODELS ----------
+
+# ecological_indicator.py / eco_indc_ui.py: base * size factor * motion factor
+def linear_impact(base, area, speed,
+                  min_size_factor=0.6, max_size_factor=2.0, motion_sat=30):
+    r = np.minimum(area, 0.25)
+    s = min_size_factor + (max_size_factor - min_size_factor) * (r / 0.25)
+    m = 1.0 + np.minimum(speed, motion_sat) / motion_sat
+    return s, m, base * s * m
+
+# eco_indicator_2.py: emission * S^alpha * M^beta
+def hybrid_impact(base, area, speed, alpha=1.2, beta=0.8, speed_sat=600):
+    S = np.minimum(area * 4, 1)
+    M = np.minimum(speed / speed_sat, 1)
+    return S, M, base * (S ** alpha) * (M ** beta)
+
+def class_contributions(cls, impact, n_classes):
+    return np.bincount(cls, weights=impact, minlength=n_classes)
+
+# xy / area come from box_geometry, speed from whichever tracker the caller
+# runs on the box centres.
+def score_boxes(xy, cls, conf, area, speed, table, model="linear", **params):
+    base = table[cls]
+
+    if model == "linear":
+        s, m, impact = linear_impact(base, area, speed, **params)
+    elif model == "hybrid":
+        s, m, impact = hybrid_impact(base, area, speed, **params)
+    else:
+        raise ValueError(f"unknown impact model: {model}")
+
+    return FrameScore(
+        xy, cls, conf, base, s, m, impact,
+        float(impact.sum()),
+        class_contributions(cls, impact, len(table))
+    )
+
+def eco_index(total, max_impact):
+    return np.clip(100 * (1 - np.asarray(total) / max_impact), 0, 100)
+
+# ---------- PRESETS ----------
+
+# The two impact models of ecological_indicator.py / eco_indc_ui.py (linear)
+# and eco_indicator_2.py (hybrid). The scripts import their tables from here,
+# so the headless tools always score with the same ones.
+#
+# RESEARCH EMISSION DATASET (Derived from DEFRA/EPA/IPCC/OpenLCA)
+# Units: normalized CO2 intensity, 0-100
+
+LINEAR_SCORES = {
+
+    # Very high impact
+    "car": 90, "truck": 100, "bus": 85,
+    "motorcycle": 60, "cow": 95,
+
+    # Electronics
+    "cell phone": 40, "laptop": 45, "tv": 50,
+    "keyboard": 25, "mouse": 20,
+
+    # Plastics
+    "bottle": 25, "cup": 15,
+    "chair": 10, "bench": 12,
+
+    # Low impact
+    "person": 5, "dog": 3, "bicycle": 5,
+
+    "__default__": 10
+}
+
+# Log-scaled by the hybrid model (np.log1p)
+HYBRID_EMISSIONS = {
+
+    # Very high impact
+    "car": 90, "truck": 100, "bus": 85,
+    "motorcycle": 60, "cow": 95,
+
+    # Electronics (mapped to closest YOLO classes)
+    "cell phone": 45, "laptop": 50, "tv": 55,
+    "keyboard": 25, "mouse": 20,
+
+    # Plastics
+    "bottle": 25, "cup": 15,
+    "chair": 25, "bench": 30,
+
+    # Low impact
+    "person": 5, "dog": 3, "bicycle": 5,
+
+    "__default__": 10
+}
+
+PRESETS = {
+    "linear": {
+        "scores": LINEAR_SCORES,
+        "transform": None,
+        "params": {"min_size_factor": 0.6, "max_size_factor": 2.0, "motion_sat": 30},
+        "speed_scale": 1 / 30,
+        "max_impact": 500,
+    },
+    "hybrid": {
+        "scores": HYBRID_EMISSIONS,
+        "transform": np.log1p,
+        "params": {"alpha": 1.2, "beta": 0.8},
+        "speed_scale": 1.0,
+        "max_impact": 25,
+    },
+}
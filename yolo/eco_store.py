@@ -0,0 +1,206 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+# Long-running eco index history on disk. Raw per-frame records and minute /
+# hour / day rollups each live in a fixed-size memory-mapped ring, so the
+# store never grows and memory stays flat however long a camera runs.
+# append() only enqueues; a writer thread does the memmap writes and updates
+# the rollups incrementally, so the frame loop never waits on the disk.
+#
+#   store = EcoStore("eco_store", n_classes=len(names))
+#   store.append(time.time(), eco, total, class_contrib)
+#   store.recent_rollups("minute", 60)["eco_mean"]
+
+LEVELS = (("minute", 60), ("hour", 3600), ("day", 86400))
+
+ROLLUP_CAPACITY = {"minute": 60 * 24 * 30, "hour": 24 * 365, "day": 3650}
+
+def frame_dtype(n_classes):
+    return np.dtype([("t", "f8"), ("eco", "f4"), ("total", "f4"),
+                     ("contrib", "f4", (n_classes,))])
+
+def rollup_dtype(n_classes):
+    return np.dtype([("t", "f8"), ("n", "i8"),
+                     ("eco_min", "f4"), ("eco_max", "f4"), ("eco_sum", "f8"),
+                     ("total_sum", "f8"), ("contrib_sum", "f8", (n_classes,))])
+
+# ---------- RING ----------
+
+# Fixed-capacity memmapped ring of records ordered by "t". The write
+# position and fill count persist in a small sidecar memmap.
+class Ring:
+
+    def __init__(self, path, dtype, capacity):
+        mode = "r+" if os.path.exists(path) else "w+"
+        self.data = np.memmap(path, dtype=dtype, mode=mode, shape=(capacity,))
+        self.meta = np.memmap(path + ".meta", dtype=np.int64, mode=mode, shape=(2,))
+        self.capacity = capacity
+
+    @property
+    def count(self):
+        return int(self.meta[1])
+
+    def last(self):
+        return (int(self.meta[0]) - 1) % self.capacity if self.count else None
+
+    def append(self):
+        slot = int(self.meta[0])
+        self.meta[0] = (slot + 1) % self.capacity
+        self.meta[1] = min(self.count + 1, self.capacity)
+        return slot
+
+    # The two contiguous pieces holding the ring in chronological order.
+    def segments(self):
+        head, n = int(self.meta[0]), self.count
+        if n < self.capacity:
+            return [self.data[:n]]
+        return [self.data[head:], self.data[:head]]
+
+    def recent(self, n):
+        segs = self.segments()
+        n = min(n, self.count)
+        out, need = [], n
+        for seg in reversed(segs):
+            if need <= 0:
+                break
+            take = seg[max(len(seg) - need, 0):]
+            out.insert(0, take)
+            need -= len(take)
+        return np.concatenate(out) if out else self.data[:0].copy()
+
+    # Records with t0 <= t < t1: a binary search per segment, then a copy
+    # of just that window.
+    def between(self, t0, t1):
+        parts = []
+        for seg in self.segments():
+            ts = seg["t"]
+            a, b = np.searchsorted(ts, [t0, t1])
+            if b > a:
+                parts.append(seg[a:b])
+        return np.concatenate(parts) if parts else self.data[:0].copy()
+
+    def flush(self):
+        self.data.flush()
+        self.meta.flush()
+
+# ---------- STORE ----------
+
+class EcoStore:
+
+    def __init__(self, path, n_classes, capacity=1_000_000, queue_size=1024):
+        os.makedirs(path, exist_ok=True)
+
+        info_path = os.path.join(path, "store.json")
+        info = {"n_classes": n_classes, "capacity": capacity}
+        if os.path.exists(info_path):
+            with open(info_path) as f:
+                stored = json.load(f)
+            if stored != info:
+                raise ValueError(f"{path} was created with {stored}, not {info}")
+        else:
+            with open(info_path, "w") as f:
+                json.dump(info, f)
+
+        self.frames = Ring(os.path.join(path, "frames.bin"), frame_dtype(n_classes), capacity)
+        self.rollups = {
+            name: Ring(os.path.join(path, f"{name}.bin"), rollup_dtype(n_classes),
+                       ROLLUP_CAPACITY[name])
+            for name, _ in LEVELS
+        }
+
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+        self.writer = threading.Thread(target=self.run, name="eco-store", daemon=True)
+        self.writer.start()
+
+    # Never blocks: when the writer falls behind the record is dropped.
+    def append(self, t, eco, total, contrib):
+        try:
+            self.queue.put_nowait((t, eco, total, np.asarray(contrib, dtype=np.float32)))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            with self.lock:
+                self.write(*item)
+
+    def write(self, t, eco, total, contrib):
+        rec = self.frames.data[self.frames.append()]
+        rec["t"] = t
+        rec["eco"] = eco
+        rec["total"] = total
+        rec["contrib"][:len(contrib)] = contrib
+
+        for name, seconds in LEVELS:
+            ring = self.rollups[name]
+            start = t - t % seconds
+            last = ring.last()
+
+            if last is None or ring.data[last]["t"] != start:
+                r = ring.data[ring.append()]
+                r["t"] = start
+                r["n"] = 0
+                r["eco_min"] = eco
+                r["eco_max"] = eco
+                r["eco_sum"] = 0
+                r["total_sum"] = 0
+                r["contrib_sum"] = 0
+            else:
+                r = ring.data[last]
+
+            r["n"] += 1
+            r["eco_min"] = min(r["eco_min"], eco)
+            r["eco_max"] = max(r["eco_max"], eco)
+            r["eco_sum"] += eco
+            r["total_sum"] += total
+            r["contrib_sum"][:len(contrib)] += contrib
+
+    # ---------- QUERIES ----------
+
+    def window(self, t0, t1):
+        with self.lock:
+            return self.frames.between(t0, t1)
+
+    def recent(self, n):
+        with self.lock:
+            return self.frames.recent(n)
+
+    def rollup(self, level, t0, t1):
+        with self.lock:
+            return with_means(self.rollups[level].between(t0, t1))
+
+    def recent_rollups(self, level, n):
+        with self.lock:
+            return with_means(self.rollups[level].recent(n))
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join()
+        self.frames.flush()
+        for ring in self.rollups.values():
+            ring.flush()
+
+# Buckets as a plain dict of arrays with the means filled in.
+def with_means(buckets):
+    n = np.maximum(buckets["n"], 1)
+    return {
+        "t": buckets["t"],
+        "n": buckets["n"],
+        "eco_min": buckets["eco_min"],
+        "eco_max": buckets["eco_max"],
+        "eco_mean": buckets["eco_sum"] / n,
+        "total_mean": buckets["total_sum"] / n,
+        "contrib_mean": buckets["contrib_sum"] / n[:, None],
+    }
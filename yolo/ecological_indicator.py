@@ -1,44 +1,60 @@
 import cv2
 import numpy as np
 import time
-from ultralytics import YOLO
+import os
+import sys
+import signal
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from profiling import profiler
+
+from backends import load_model
+from eco_scoring import LINEAR_SCORES, class_table, score_boxes
+from tracking import MultiObjectTracker
+from cadence import AdaptiveCadence
+from motion_gate import MotionGate
+from detector import Detector
+from tiling import Tiler
+from qos import ImgszController
+from parser import EmissionTable
+from metrics import MetricsServer
+from recorder import Recorder
+from det_log import DetectionLog
 
 MODEL_NAME = "yolov8n.pt"
 CONFIDENCE_THRESHOLD = 0.35
 
-# ECOLOGICAL IMPACT SCALE (0–100 normalized)
-# RESEARCH EMISSION DATASET (Derived from DEFRA/EPA/IPCC/OpenLCA)
-# Units: normalized CO2 intensity
-
-eco_scores = {
-
-    # Very high impact
-    "car": 90,
-    "truck": 100,
-    "bus": 85,
-    "motorcycle": 60,
-    "cow": 95,
-
-    # Electronics
-    "cell phone": 40,
-    "laptop": 45,
-    "tv": 50,
-    "keyboard": 25,
-    "mouse": 20,
-
-    # Plastics
-    "bottle": 25,
-    "cup": 15,
-    "chair": 10,
-    "bench": 12,
-
-    # Low impact
-    "person": 5,
-    "dog": 3,
-    "bicycle": 5,
-
-    "__default__": 10
-}
+# Inference backend: "torch", "onnx", "onnx-int8", "openvino", "openvino-int8"
+# (exported and cached next to the weights on first use; the -int8 ones
+# calibrate on the sample frames in CALIB_DIR)
+BACKEND = "torch"
+CALIB_DIR = None
+
+# Detect every N frames (N adapted to hold TARGET_FPS, or sooner on a scene
+# change) and carry boxes forward with the tracker in between
+ADAPTIVE_CADENCE = False
+TARGET_FPS = 30
+
+# Skip inference while the scene is static and reuse the last detections
+MOTION_GATE = False
+
+# Detect on overlapping TILE_SIZE crops batched together (for 4K cameras
+# where small objects vanish at the default input size); TILE_MOTION_ONLY
+# re-runs only the tiles with motion
+TILED = False
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2
+TILE_MOTION_ONLY = False
+
+# Move the model input size between QOS_SIZES so inference holds TARGET_FPS
+# (torch backend only: exported models have a fixed input size)
+QOS = False
+QOS_SIZES = (320, 416, 640)
+
+# ECOLOGICAL IMPACT SCALE (0–100 normalized), from eco_scoring so the
+# headless tools score with the same table
+eco_scores = LINEAR_SCORES
 
 # Size + motion scaling
 MIN_SIZE_FACTOR = 0.6
@@ -47,16 +63,29 @@ MOTION_SAT = 30
 
 MAX_FRAME_IMPACT = 500
 
-def get_score(cls):
-    return eco_scores.get(cls, eco_scores["__default__"])
+# Score from the emission CSV instead of the table above; edits to the CSV
+# are picked up while running (e.g. "emission_dataset.csv")
+EMISSION_CSV = None
+
+# Run without windows or drawing (display-less servers); stop with Ctrl+C
+HEADLESS = False
+
+# Serve eco index, class contributions, FPS and stage latencies in Prometheus
+# text format on this local port (e.g. 9108)
+METRICS_PORT = None
 
-def size_factor(area_ratio):
-    r = min(area_ratio, 0.25)
-    return MIN_SIZE_FACTOR + (MAX_SIZE_FACTOR - MIN_SIZE_FACTOR) * (r / 0.25)
+# Record the annotated stream to segmented video files in this folder (e.g.
+# "recordings"), starting a new file every RECORD_SEGMENT_SECONDS and/or
+# RECORD_SEGMENT_MB
+RECORD_DIR = None
+RECORD_SEGMENT_SECONDS = 600
+RECORD_SEGMENT_MB = None
 
-def motion_factor(speed):
-    s = min(speed, MOTION_SAT)
-    return 1.0 + (s / MOTION_SAT)
+# Append every frame's boxes (frame index, time, xyxy, class, confidence,
+# tracker speed) to a columnar detection log in this folder (e.g. "detlog"),
+# for re-scoring and audits without keeping the video; read it back with
+# det_log.read_log, sweep scoring parameters over it with replay.py
+DETECTION_LOG = None
 
 # COLOR MAP
 def eco_color(score):
@@ -75,73 +104,99 @@ def normalize(total):
     return max(0, min(100, val))
 
 
-# Simple motion tracker to estimate speed for motion factor (not object-specific, just class-based)
-class Tracker:
+model = load_model(BACKEND, MODEL_NAME, calib_dir=CALIB_DIR)
 
-    def __init__(self):
-        self.prev = {}
+names = model.names
 
-    def speed(self, key, cx, cy):
+score_table = class_table(eco_scores, names)
+emissions = EmissionTable(EMISSION_CSV, names) if EMISSION_CSV else None
 
-        now = time.time()
-        if key in self.prev:
-            px, py, pt = self.prev[key]
-            dt = now - pt
-            if dt > 0:
-                v = np.hypot(cx - px, cy - py) / dt
-            else:
-                v = 0
-        else:
-            v = 0
+# Per-object tracker (persistent ids) to estimate speed for motion factor
+tracker = MultiObjectTracker()
+cadence = AdaptiveCadence(TARGET_FPS) if ADAPTIVE_CADENCE else None
+gate = MotionGate() if MOTION_GATE else None
+tiler = Tiler(TILE_SIZE, TILE_OVERLAP, motion_only=TILE_MOTION_ONLY) if TILED else None
+if QOS and BACKEND != "torch":
+    print(f"QOS disabled: the {BACKEND} export is built for one input size")
+    QOS = False
+qos = ImgszController(QOS_SIZES, TARGET_FPS) if QOS else None
+detector = Detector(profiler.wrap(model, "model"), tracker, CONFIDENCE_THRESHOLD, cadence, gate, tiler, qos)
+score_boxes = profiler.wrap(score_boxes, "scoring")
 
-        self.prev[key] = (cx, cy, now)
-        return v / 30
-
-
-model = YOLO(MODEL_NAME)
-tracker = Tracker()
-
-names = model.model.names if hasattr(model, "model") else model.names
+metrics = MetricsServer(METRICS_PORT, prefix="ecological_indicator_") if METRICS_PORT else None
 
 cap = cv2.VideoCapture(0)
-
-while True:
-
-    ret, frame = cap.read()
+recorder = Recorder.from_config(RECORD_DIR, RECORD_SEGMENT_SECONDS, RECORD_SEGMENT_MB)
+det_log = DetectionLog(DETECTION_LOG, names) if DETECTION_LOG else None
+
+frames = 0
+prev_time = time.time()
+
+def publish(scored, eco_index, stages):
+    global prev_time
+
+    now = time.time()
+    fps = 1 / max(now - prev_time, 1e-9)
+    prev_time = now
+
+    metrics.publish(
+        eco_index=eco_index,
+        eco_total_impact=scored.total,
+        eco_class_contribution={names[i]: scored.class_contrib[i]
+                                for i in np.flatnonzero(scored.class_contrib)},
+        fps=fps,
+        frames_total=frames,
+        stage_latency_seconds=stages,
+        imgsz=qos.imgsz if qos is not None else None,
+    )
+
+# Ctrl+C ends the headless loop cleanly
+stop = threading.Event()
+if HEADLESS:
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+
+while not stop.is_set():
+
+    with profiler.span("capture"):
+        ret, frame = cap.read()
     if not ret:
         break
 
-    h, w = frame.shape[:2]
-
-    results = model(frame, conf=CONFIDENCE_THRESHOLD)[0]
-
-    total_impact = 0
-
-    if results.boxes is not None:
-
-        for box in results.boxes:
-
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            cls = names[int(box.cls[0])]
-            conf = float(box.conf[0])
-
-            cx = (x1 + x2) // 2
-            cy = (y1 + y2) // 2
-
-            area = ((x2 - x1) * (y2 - y1)) / (w * h)
-
-            base = get_score(cls)
-            s = size_factor(area)
-            m = motion_factor(tracker.speed(cls, cx, cy))
-
-            impact = base * s * m
-            total_impact += impact
+    t0 = time.perf_counter()
+    now = time.time()
+    with profiler.span("detect"):
+        xy, cls, conf, area, speed = detector(frame, now)
+    if det_log is not None:
+        det_log.append(frames, now, xy, cls, conf, frame.shape, speed)
+    speed = speed / 30
+    t_detect = time.perf_counter() - t0
+
+    scored = score_boxes(
+        xy, cls, conf, area, speed,
+        emissions.current() if emissions is not None else score_table,
+        min_size_factor=MIN_SIZE_FACTOR,
+        max_size_factor=MAX_SIZE_FACTOR,
+        motion_sat=MOTION_SAT
+    )
+    total_impact = scored.total
+    stages = {"detect": t_detect, "scoring": time.perf_counter() - t0 - t_detect}
+    frames += 1
+
+    if HEADLESS:
+        if metrics is not None:
+            publish(scored, normalize(total_impact), stages)
+        continue
+
+    with profiler.span("draw"):
+        for (x1, y1, x2, y2), c, base, impact in zip(
+                scored.xyxy.tolist(), scored.cls.tolist(),
+                scored.base.tolist(), scored.impact.tolist()):
 
             color = eco_color(base)
 
             cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
             cv2.putText(frame,
-                        f"{cls} {impact:.1f}",
+                        f"{names[c]} {impact:.1f}",
                         (x1, y1 - 5),
                         cv2.FONT_HERSHEY_SIMPLEX,
                         0.5,
@@ -149,21 +204,49 @@ while True:
                         2)
 
     eco_index = normalize(total_impact)
+    if metrics is not None:
+        publish(scored, eco_index, stages)
 
-    cv2.rectangle(frame, (10, 10), (320, 90), (30, 30, 30), -1)
+    with profiler.span("draw"):
+        cv2.rectangle(frame, (10, 10), (320, 90), (30, 30, 30), -1)
 
-    cv2.putText(frame,
-                f"ECO INDEX: {eco_index:.1f}/100",
-                (20, 50),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1,
-                (0, 255, 0) if eco_index > 50 else (0, 0, 255),
-                3)
+        cv2.putText(frame,
+                    f"ECO INDEX: {eco_index:.1f}/100",
+                    (20, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    1,
+                    (0, 255, 0) if eco_index > 50 else (0, 0, 255),
+                    3)
 
-    cv2.imshow("Ecological Indicator", frame)
+        if qos is not None:
+            cv2.putText(frame, f"IMGSZ {qos.imgsz}", (20, 80),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
 
-    if cv2.waitKey(1) == 27:
+    if recorder is not None:
+        recorder.write(frame)
+
+    with profiler.span("display"):
+        cv2.imshow("Ecological Indicator", frame)
+        key = cv2.waitKey(1)
+
+    if key == 27:
         break
 
+if gate is not None:
+    print(gate.summary())
+
+if tiler is not None:
+    print(tiler.summary())
+
+if recorder is not None:
+    recorder.close()
+
+if det_log is not None:
+    det_log.close()
+
+if metrics is not None:
+    metrics.close()
+
 cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+if not HEADLESS:
+    cv2.destroyAllWindows()
\ No newline at end of file
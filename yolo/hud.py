@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+
+# Layered HUD for eco_indc_ui.py. Everything the HUD draws sits in the
+# top-left ROI, so it is rendered into an ROI-sized layer plus mask and
+# copied onto the frame in one masked pass:
+#   - static layer (dark panel, grey gauge track) rendered once per frame size
+#   - dynamic elements (gauge value, texts, trend) drawn onto a copy of it
+#   - the trend is one cv2.polylines call over a preallocated point array
+
+ROI_W, ROI_H = 640, 320
+
+GAUGE_CENTER = (550, 100)
+GAUGE_RADIUS = 60
+
+TREND_X0, TREND_Y0, TREND_STEP = 50, 300, 2
+
+PANEL_BG = (30, 30, 30)
+TRACK = (60, 60, 60)
+
+class HudLayers:
+
+    def __init__(self, eco_color, history_len=120):
+        self.eco_color = eco_color
+        self.size = None
+
+        self.trend = np.empty((history_len, 2), dtype=np.int32)
+        self.trend[:, 0] = TREND_X0 + TREND_STEP * np.arange(history_len)
+
+    def build_static(self, w, h):
+        rw, rh = min(w, ROI_W), min(h, ROI_H)
+
+        self.static = np.zeros((rh, rw, 3), dtype=np.uint8)
+        self.static_mask = np.zeros((rh, rw), dtype=np.uint8)
+
+        for img, color in ((self.static, PANEL_BG), (self.static_mask, 255)):
+            cv2.rectangle(img, (10, 10), (300, 110), color, -1)
+
+        for img, color in ((self.static, TRACK), (self.static_mask, 255)):
+            cv2.ellipse(img, GAUGE_CENTER, (GAUGE_RADIUS, GAUGE_RADIUS),
+                        0, 180, 0, color, 10)
+
+        self.layer = np.empty_like(self.static)
+        self.mask = np.empty_like(self.static_mask)
+        self.size = (w, h)
+
+    # Draw on the layer and mark the same pixels in the mask.
+    def text(self, s, org, scale, color, thickness):
+        cv2.putText(self.layer, s, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        cv2.putText(self.mask, s, org, cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+
+    def render(self, frame, eco, history, status, top=None, extra=()):
+        h, w = frame.shape[:2]
+        if self.size != (w, h):
+            self.build_static(w, h)
+
+        np.copyto(self.layer, self.static)
+        np.copyto(self.mask, self.static_mask)
+
+        # texts inside the panel are covered by the static mask already
+        cv2.putText(self.layer, f"ECO INDEX: {eco:.1f}", (20, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, self.eco_color(100 - eco), 3)
+
+        # gauge
+        angle = int(180 * eco / 100)
+        for img, color in ((self.layer, self.eco_color(100 - eco)), (self.mask, 255)):
+            cv2.ellipse(img, GAUGE_CENTER, (GAUGE_RADIUS, GAUGE_RADIUS),
+                        0, 180, 180 - angle, color, 10)
+        self.text(f"{eco:.1f}", (GAUGE_CENTER[0] - 30, GAUGE_CENTER[1] + 10),
+                  0.8, (255, 255, 255), 2)
+
+        # trend
+        n = len(history)
+        if n >= 2:
+            pts = self.trend[:n]
+            pts[:, 1] = TREND_Y0 - np.fromiter(history, dtype=np.float64, count=n).astype(np.int32)
+            cv2.polylines(self.layer, [pts], False, (0, 255, 0), 2)
+            cv2.polylines(self.mask, [pts], False, 255, 2)
+
+        if top is not None:
+            self.text(f"Top impact: {top}", (20, 140), 0.6, (0, 255, 255), 2)
+
+        self.text(status, (20, 170), 0.5, (255, 255, 255), 1)
+
+        for i, line in enumerate(extra):
+            self.text(line, (20, 200 + 18 * i), 0.45, (200, 200, 200), 1)
+
+        rh, rw = self.mask.shape
+        cv2.copyTo(self.layer, self.mask, frame[:rh, :rw])
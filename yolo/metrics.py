@@ -0,0 +1,81 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local metrics endpoint in Prometheus text format for the headless runs:
+#
+#   metrics = MetricsServer(9108)
+#   metrics.publish(eco_index=eco, fps=fps, stage_latency_seconds={"inference": 0.03})
+#   curl localhost:9108/metrics
+#
+# publish() only swaps in a new dict of values (None values are left out);
+# the HTTP thread formats whatever dict is current when a scrape arrives, so
+# the frame loop never waits on a client.
+
+# name -> (type, help, label name for dict values)
+METRICS = {
+    "eco_index": ("gauge", "Eco index of the latest scored frame (0-100, higher is cleaner).", None),
+    "eco_total_impact": ("gauge", "Summed impact of the boxes in the latest scored frame.", None),
+    "eco_class_contribution": ("gauge", "Impact of the latest scored frame per class.", "class"),
+    "detections": ("gauge", "Boxes in the latest frame per class.", "class"),
+    "fps": ("gauge", "Frames per second of the main loop.", None),
+    "frames_total": ("counter", "Frames processed since start.", None),
+    "stage_latency_seconds": ("gauge", "Latest per-frame latency of each pipeline stage.", "stage"),
+    "imgsz": ("gauge", "Model input size chosen by the QoS controller.", None),
+}
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def render(values, prefix):
+    lines = []
+    for name, value in values.items():
+        if value is None:
+            continue
+        kind, help_, label = METRICS.get(name, ("gauge", name, None))
+        full = prefix + name
+        lines.append(f"# HELP {full} {help_}")
+        lines.append(f"# TYPE {full} {kind}")
+        if isinstance(value, dict):
+            for key, v in value.items():
+                lines.append(f"{full}{{{label}=\"{escape(key)}\"}} {float(v)}")
+        else:
+            lines.append(f"{full} {float(value)}")
+    return "\n".join(lines) + "\n"
+
+class MetricsServer:
+
+    def __init__(self, port=9108, host="127.0.0.1", prefix="yolo_"):
+        self.values = {}
+        self.prefix = prefix
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = render(metrics.values, metrics.prefix).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       name="metrics", daemon=True)
+        self.thread.start()
+        print(f"metrics on http://{host}:{self.server.server_port}/metrics")
+
+    def publish(self, **values):
+        self.values = values
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
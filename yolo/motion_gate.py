@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+
+# Cheap "did anything move?" check in front of model(frame), in the spirit of
+# alarm/smart_intrusion_alarm.cpp: running-average background on a small
+# blurred grey copy of the frame, thresholded difference, fraction of moving
+# pixels. Static frames reuse the previous detections.
+
+class MotionGate:
+
+    def __init__(self, size=(160, 90), pixel_threshold=25, min_motion=0.002,
+                 learning_rate=0.05, max_skip=150):
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.min_motion = min_motion          # fraction of pixels that must change
+        self.learning_rate = learning_rate    # background update speed
+        self.max_skip = max_skip              # force a refresh after this many skips
+
+        self.background = None
+        self.mask = None
+        self.skipped_in_row = 0
+
+        self.frames = 0
+        self.hits = 0
+        self.infer_time = 0.0
+
+    # True when the scene moved (or the gate has been closed for max_skip
+    # frames) and the detector should run.
+    def moving(self, frame):
+        self.frames += 1
+
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            self.mask = np.full(gray.shape, 255, dtype=np.uint8)
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        _, self.mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        motion = cv2.countNonZero(self.mask) / self.mask.size
+
+        if motion >= self.min_motion or self.skipped_in_row >= self.max_skip:
+            self.skipped_in_row = 0
+            return True
+
+        self.skipped_in_row += 1
+        self.hits += 1
+        return False
+
+    # Feed the measured inference time so skipped frames can be costed.
+    def record_inference(self, dt):
+        self.infer_time = dt if self.infer_time == 0 else 0.9 * self.infer_time + 0.1 * dt
+
+    def hit_rate(self):
+        return self.hits / max(self.frames, 1)
+
+    def time_saved(self):
+        return self.hits * self.infer_time
+
+    def summary(self):
+        return (f"gate: {self.hit_rate()*100:.0f}% skipped "
+                f"({self.hits}/{self.frames}), ~{self.time_saved():.1f}s saved")
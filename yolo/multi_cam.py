@@ -0,0 +1,177 @@
+import argparse
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from backends import BACKENDS, load_model
+from eco_scoring import PRESETS, class_table, box_arrays, box_geometry, score_boxes, eco_index
+from tracking import MultiObjectTracker
+from pipeline import LatestQueue, CaptureStage
+
+# Several cameras, one model. Every source gets a capture thread that keeps
+# only its newest frame; the main loop stacks whatever is new into a single
+# model([...]) call and routes each result back to that camera's own tracker,
+# eco_history and class_contrib.
+#
+#   python multi_cam.py 0 1 traffic.mp4 rtsp://127.0.0.1:8554/cam3 --show
+
+# ---------- PER-CAMERA STATE ----------
+
+class Camera:
+
+    def __init__(self, source, stop, n_classes):
+        self.source = source
+        self.cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+        self.queue = LatestQueue(1)
+
+        # files play back at their own rate instead of as fast as decoding goes
+        is_file = not source.isdigit() and "://" not in source
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if is_file else 0
+        self.capture = CaptureStage(self.cap, [self.queue], stop, name=f"capture:{source}",
+                                    pace=1 / fps if fps else 0.0, stop_on_end=False)
+
+        self.tracker = MultiObjectTracker()
+        self.eco_history = deque(maxlen=120)
+        self.class_contrib = np.zeros(n_classes)
+        self.session_total = 0.0
+
+        self.inferred = 0
+        self.fps = 0.0
+        self.latency = 0.0
+        self.prev_t = None
+
+    def record(self, captured_at):
+        now = time.time()
+        self.latency = now - captured_at
+        if self.prev_t is not None:
+            dt = max(now - self.prev_t, 1e-6)
+            self.fps = 1 / dt if self.fps == 0 else 0.9 * self.fps + 0.1 / dt
+        self.prev_t = now
+        self.inferred += 1
+
+    def stats(self):
+        return (f"[{self.source}] {self.fps:.1f} FPS  "
+                f"lat {self.latency*1000:.0f}ms  "
+                f"cap {self.capture.processed}  drop {self.queue.dropped}  "
+                f"eco {self.eco_history[-1] if self.eco_history else 100:.1f}")
+
+# ---------- SCHEDULING ----------
+
+# Round-robin over sources starting one further each call, so when more
+# sources are ready than fit in a batch every source still gets its turn.
+# Sources without a new frame are skipped, never waited on.
+def collect_batch(cameras, start, max_batch):
+    batch = []
+    n = len(cameras)
+    for k in range(n):
+        cam = cameras[(start + k) % n]
+        item = cam.queue.poll()
+        if item is not None:
+            batch.append((cam, item))
+            if len(batch) >= max_batch:
+                break
+    return batch
+
+# ---------- DRAWING ----------
+
+def draw(frame, cam, scored, eco, names):
+    for (x1, y1, x2, y2), c, impact in zip(
+            scored.xyxy.tolist(), scored.cls.tolist(), scored.impact.tolist()):
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 220, 220), 2)
+        cv2.putText(frame, f"{names[c]} {impact:.1f}", (x1, y1 - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 220, 220), 2)
+
+    cv2.rectangle(frame, (10, 10), (330, 80), (30, 30, 30), -1)
+    cv2.putText(frame, f"ECO INDEX: {eco:.1f}", (20, 45),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0) if eco > 50 else (0, 0, 255), 2)
+    cv2.putText(frame, f"{cam.fps:.1f} FPS  {cam.latency*1000:.0f}ms", (20, 70),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+# ---------- MAIN ----------
+
+def main():
+    ap = argparse.ArgumentParser(description="Eco indicator over several sources with one batched model")
+    ap.add_argument("sources", nargs="+", help="device index, video file or stream URL")
+    ap.add_argument("--weights", default="yolov8n.pt")
+    ap.add_argument("--backend", choices=BACKENDS, default="torch")
+    ap.add_argument("--calib-dir", help="sample frames for the -int8 backends")
+    ap.add_argument("--model", choices=sorted(PRESETS), default="linear")
+    ap.add_argument("--conf", type=float, default=0.35)
+    ap.add_argument("--imgsz", type=int, default=640)
+    ap.add_argument("--max-batch", type=int, default=8)
+    ap.add_argument("--show", action="store_true", help="one window per source")
+    ap.add_argument("--stats-every", type=float, default=5.0, help="seconds between stat lines")
+    args = ap.parse_args()
+
+    model = load_model(args.backend, args.weights, args.imgsz, args.calib_dir)
+    names = model.names
+
+    preset = PRESETS[args.model]
+    table = class_table(preset["scores"], names, preset["transform"])
+
+    stop = threading.Event()
+    cameras = [Camera(src, stop, len(table)) for src in args.sources]
+    for cam in cameras:
+        cam.capture.start()
+
+    start = 0
+    last_stats = time.time()
+
+    while True:
+
+        batch = collect_batch(cameras, start, args.max_batch)
+        start = (start + 1) % len(cameras)
+
+        if not batch:
+            if all(cam.capture.done for cam in cameras):
+                break
+            time.sleep(0.002)
+            continue
+
+        frames = [item[2] for _, item in batch]
+        results = model(frames, conf=args.conf, imgsz=args.imgsz, verbose=False)
+
+        for (cam, (idx, ts, frame)), res in zip(batch, results):
+            h, w = frame.shape[:2]
+
+            xyxy, cls, conf = box_arrays(res)
+            xy, _, area = box_geometry(xyxy, w, h)
+            _, speed = cam.tracker.update(xy, cls, ts, conf)
+
+            scored = score_boxes(
+                xy, cls, conf, area, speed * preset["speed_scale"], table,
+                model=args.model, **preset["params"]
+            )
+
+            eco = float(eco_index(scored.total, preset["max_impact"]))
+            cam.class_contrib = scored.class_contrib
+            cam.eco_history.append(eco)
+            cam.session_total += scored.total
+            cam.record(ts)
+
+            if args.show:
+                draw(frame, cam, scored, eco, names)
+                cv2.imshow(f"Eco Indicator [{cam.source}]", frame)
+
+        if args.show and cv2.waitKey(1) == 27:
+            break
+
+        if time.time() - last_stats >= args.stats_every:
+            last_stats = time.time()
+            for cam in cameras:
+                print(cam.stats())
+
+    stop.set()
+    for cam in cameras:
+        cam.capture.join(timeout=1.0)
+        cam.cap.release()
+        print(cam.stats())
+
+    if args.show:
+        cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,116 @@
-import pandas as pd
+import csv
+import os
+import time
 
-def load_eco_scores(csv_path="emission_dataset.csv"):
+import numpy as np
 
-    df = pd.read_csv(csv_path)
+# Raises ValueError on a row with a missing or empty class or intensity,
+# e.g. the last line of a CSV caught while it is being saved.
+def load_eco_scores(csv_path="emission_dataset.csv"):
 
     eco_scores = {}
 
-    for _, row in df.iterrows():
-        score = float(row["relative_intensity"]) * 100
-        eco_scores[row["class"]] = score
+    with open(csv_path, newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            name, value = row.get("class"), row.get("relative_intensity")
+            if not name or not value:
+                raise ValueError(f"{csv_path}:{reader.line_num}: incomplete row")
+            score = float(value) * 100
+            eco_scores[name] = score
 
     return eco_scores
 
+# ---------- COMPILED TABLE ----------
+
+# The CSV compiled into a float array indexed by YOLO class id, default
+# filled and normalized ("linear": score as is, "log": log(score + 1) as in
+# eco_indicator_2.py). Cached next to the CSV as <stem>.<normalize>.npz and
+# rebuilt when the CSV's mtime/size or the model's class names change.
+
+NORMALIZERS = {
+    "linear": lambda t: t,
+    "log": np.log1p,
+}
+
+def _names_key(names):
+    return "|".join(names[i] for i in sorted(names))
+
+def _csv_key(csv_path):
+    st = os.stat(csv_path)
+    return st.st_mtime_ns, st.st_size
+
+def cache_path(csv_path, normalize):
+    stem, _ = os.path.splitext(csv_path)
+    return f"{stem}.{normalize}.npz"
+
+def compile_table(csv_path, names, normalize="linear"):
+    scores = load_eco_scores(csv_path)
+
+    n = max(names) + 1 if names else 0
+    table = np.full(n, scores.get("__default__", 0.0), dtype=np.float64)
+    for i, name in names.items():
+        if name in scores:
+            table[i] = scores[name]
+
+    return NORMALIZERS[normalize](table)
+
+def load_table(csv_path, names, normalize="linear"):
+    mtime, size = _csv_key(csv_path)
+    key = _names_key(names)
+    path = cache_path(csv_path, normalize)
+
+    if os.path.exists(path):
+        try:
+            with np.load(path) as c:
+                if (int(c["mtime"]) == mtime and int(c["size"]) == size
+                        and str(c["names"]) == key):
+                    return c["table"]
+        except (OSError, KeyError, ValueError):
+            pass
+
+    table = compile_table(csv_path, names, normalize)
+
+    # np.savez appends .npz to names without it, so keep the suffix on tmp
+    tmp = path[:-4] + ".tmp.npz"
+    np.savez(tmp, table=table, mtime=mtime, size=size, names=key)
+    os.replace(tmp, path)
+
+    return table
+
+# Live view of the compiled table for a running pipeline: current() stats
+# the CSV at most once per check_every seconds and recompiles after edits.
+class EmissionTable:
+
+    def __init__(self, csv_path, names, normalize="linear", check_every=1.0):
+        self.csv_path = csv_path
+        self.names = names
+        self.normalize = normalize
+        self.check_every = check_every
+
+        self.key = _csv_key(csv_path)
+        self.table = load_table(csv_path, names, normalize)
+        self.checked = time.monotonic()
+        self.reloads = 0
+
+    def current(self):
+        now = time.monotonic()
+        if now - self.checked >= self.check_every:
+            self.checked = now
+            try:
+                key = _csv_key(self.csv_path)
+                if key != self.key:
+                    self.table = load_table(self.csv_path, self.names, self.normalize)
+                    self.key = key
+                    self.reloads += 1
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # half-written CSV: keep scoring with the previous table
+                print(f"emission table reload failed: {e}")
+
+        return self.table
+
 
-eco_scores = load_eco_scores()
+if __name__ == "__main__":
+    eco_scores = load_eco_scores()
 
-print(eco_scores)
\ No newline at end of file
+    print(eco_scores)
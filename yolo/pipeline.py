@@ -0,0 +1,136 @@
+import threading
+import queue
+import time
+
+# ---------- QUEUES ----------
+
+# Bounded queue that never blocks the producer: when full, the oldest
+# item is thrown away so consumers always see the newest frame.
+class LatestQueue:
+
+    def __init__(self, maxsize=1):
+        self.q = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, item):
+        while True:
+            try:
+                self.q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.q.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        return self.q.get(timeout=timeout)
+
+    def poll(self):
+        try:
+            return self.q.get_nowait()
+        except queue.Empty:
+            return None
+
+    def depth(self):
+        return self.q.qsize()
+
+# ---------- STAGES ----------
+
+# Reads the camera as fast as it delivers and fans every frame out to the
+# given queues as (frame_index, timestamp, frame). The first queue gets the
+# captured frame, every other one its own copy, so a consumer drawing on its
+# frame never races one reading it. `pace` (seconds per frame) throttles
+# file sources to their native rate. When the source ends the shared stop
+# event is set unless stop_on_end is False.
+class CaptureStage(threading.Thread):
+
+    def __init__(self, cap, outboxes, stop, name="capture", pace=0.0, stop_on_end=True):
+        super().__init__(name=name, daemon=True)
+        self.cap = cap
+        self.outboxes = outboxes
+        self.stop = stop
+        self.pace = pace
+        self.stop_on_end = stop_on_end
+        self.done = False
+        self.processed = 0
+        self.latency = 0.0
+
+    def run(self):
+        next_t = time.perf_counter()
+
+        while not self.stop.is_set():
+            t0 = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+
+            ts = time.time()
+            for k, box in enumerate(self.outboxes):
+                box.put((self.processed, ts, frame if k == 0 else frame.copy()))
+
+            self.processed += 1
+            self.latency = time.perf_counter() - t0
+
+            if self.pace:
+                next_t += self.pace
+                time.sleep(max(0.0, next_t - time.perf_counter()))
+
+        self.done = True
+        if self.stop_on_end:
+            self.stop.set()
+
+# Pulls from inbox, applies fn and pushes the result to outbox.
+class Stage(threading.Thread):
+
+    def __init__(self, name, fn, inbox, outbox, stop):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop = stop
+        self.processed = 0
+        self.latency = 0.0
+
+    def run(self):
+        while not self.stop.is_set():
+            try:
+                item = self.inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            t0 = time.perf_counter()
+            out = self.fn(item)
+            self.latency = time.perf_counter() - t0
+            self.processed += 1
+
+            if out is not None and self.outbox is not None:
+                self.outbox.put(out)
+
+# ---------- STATS ----------
+
+# Counters for a stage that runs inline on the caller's thread (the render
+# loop has to stay on the main thread for cv2.imshow).
+class InlineStage:
+
+    def __init__(self):
+        self.processed = 0
+        self.latency = 0.0
+
+    def record(self, t0):
+        self.latency = time.perf_counter() - t0
+        self.processed += 1
+
+# One line per stage: frames handled, last latency, depth and drops of the
+# queue it feeds from.
+def stage_stats(stages):
+    lines = []
+    for name, stage, inbox in stages:
+        depth = inbox.depth() if inbox is not None else 0
+        dropped = inbox.dropped if inbox is not None else 0
+        lines.append(
+            f"{name}: n={stage.processed} "
+            f"{stage.latency*1000:.1f}ms q={depth} drop={dropped}"
+        )
+    return lines
@@ -0,0 +1,72 @@
+import time
+
+# Picks the YOLO input size per frame so inference fits a time budget on a
+# node whose CPU share varies:
+#
+#   qos = ImgszController((320, 416, 640), target_fps=30)
+#   model(frame, imgsz=qos.imgsz)
+#   qos.record(inference_seconds)
+#
+# Latency is smoothed with an EMA. Above budget the controller steps down a
+# size; it steps back up only when the latency predicted for the larger size
+# (cost ~ pixels, so scaled by (next / current)^2) stays below up_margin x
+# budget. That gap plus a minimum dwell time between changes keeps it from
+# oscillating between two sizes. Every change is logged.
+#
+# Exported ONNX / OpenVINO models have a fixed input size, so this needs the
+# torch backend.
+
+class ImgszController:
+
+    def __init__(self, sizes=(320, 416, 640), target_fps=None, target_latency=None,
+                 start=None, alpha=0.2, up_margin=0.9, min_dwell=2.0, min_samples=10,
+                 log=print):
+        if target_latency is None:
+            target_latency = 1.0 / (target_fps or 30)
+
+        self.sizes = sorted(sizes)
+        self.budget = target_latency
+        self.alpha = alpha
+        self.up_margin = up_margin
+        self.min_dwell = min_dwell
+        self.min_samples = min_samples
+        self.log = log
+
+        self.level = self.sizes.index(start) if start in self.sizes else len(self.sizes) - 1
+        self.ema = None
+        self.samples = 0
+        self.changed_at = time.monotonic()
+        self.changes = 0
+
+    @property
+    def imgsz(self):
+        return self.sizes[self.level]
+
+    def record(self, latency):
+        self.ema = latency if self.ema is None else self.ema + self.alpha * (latency - self.ema)
+        self.samples += 1
+
+        now = time.monotonic()
+        if self.samples < self.min_samples or now - self.changed_at < self.min_dwell:
+            return
+
+        if self.ema > self.budget and self.level > 0:
+            self.set_level(self.level - 1, now)
+
+        elif self.level < len(self.sizes) - 1:
+            scale = (self.sizes[self.level + 1] / self.imgsz) ** 2
+            if self.ema * scale < self.budget * self.up_margin:
+                self.set_level(self.level + 1, now)
+
+    def set_level(self, level, now):
+        old = self.imgsz
+        self.level = level
+        self.changes += 1
+        if self.log is not None:
+            self.log(f"[qos {time.strftime('%H:%M:%S')}] imgsz {old} -> {self.imgsz} "
+                     f"(latency {self.ema*1000:.1f} ms, budget {self.budget*1000:.1f} ms)")
+
+        # latency at the new size starts from the cost model, then re-measures
+        self.ema *= (self.imgsz / old) ** 2
+        self.samples = 0
+        self.changed_at = now
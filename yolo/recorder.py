@@ -0,0 +1,178 @@
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+
+import cv2
+
+# Records the annotated stream without slowing the live loop:
+#
+#   recorder = Recorder("recordings", fps=30, max_seconds=600)
+#   recorder = Recorder.from_config(RECORD_DIR, RECORD_SEGMENT_SECONDS, RECORD_SEGMENT_MB)
+#   ...
+#   recorder.write(frame)      # after drawing, before the next cap.read()
+#   ...
+#   recorder.close()
+#
+# write() only puts the frame on a bounded queue; a background thread owns
+# the cv2.VideoWriter. When the encoder or the disk falls behind the queue
+# fills up and new frames are dropped (and counted) instead of blocking.
+# Output is split into segments, rotated by duration and/or file size, and
+# every finished segment is logged to <out_dir>/segments.jsonl with its
+# frame and drop counts.
+#
+# fps is only the file's frame rate: frames are placed by the time they were
+# queued, repeating the previous frame over gaps and skipping frames that
+# come faster than fps, so playback runs at real speed whatever rate the
+# loop actually manages. If the writer thread fails, the error is printed and
+# further frames are dropped.
+#
+# The frame is queued as-is, not copied: don't draw on it after write().
+
+class Recorder(threading.Thread):
+
+    def __init__(self, out_dir, fps=30.0, fourcc="mp4v", ext=".mp4", prefix="rec",
+                 queue_size=64, max_seconds=None, max_bytes=None):
+        super().__init__(name="recorder", daemon=True)
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.out_dir = out_dir
+        self.fps = fps
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.ext = ext
+        self.prefix = prefix
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+
+        self.queue = queue.Queue(maxsize=queue_size)
+
+        self.writer = None
+        self.path = None
+        self.size = None
+        self.segment = None
+        self.size_checked = 0.0
+        self.last = None
+        self.lock = threading.Lock()     # segment counters, shared with write()
+        self.error = None
+
+        self.written = 0
+        self.dropped = 0
+        self.skipped = 0                 # faster than fps
+        self.segments = 0
+
+        self.start()
+
+    # None when out_dir is not set; segment_mb in megabytes.
+    @classmethod
+    def from_config(cls, out_dir, segment_seconds=None, segment_mb=None, fps=30.0):
+        if not out_dir:
+            return None
+        return cls(out_dir, fps, max_seconds=segment_seconds,
+                   max_bytes=segment_mb and segment_mb * 1024 * 1024)
+
+    # Never blocks; False when the frame was dropped.
+    def write(self, frame):
+        if self.error is None:
+            try:
+                self.queue.put_nowait((time.time(), frame))
+                return True
+            except queue.Full:
+                pass
+        with self.lock:
+            self.dropped += 1
+            if self.segment is not None:
+                self.segment["dropped"] += 1
+        return False
+
+    def run(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                self.put(*item)
+            self.finish()
+        except Exception as e:
+            self.error = e
+            print("recorder: writer thread failed, recording stopped")
+            traceback.print_exc()
+
+    # Writes the frame queued at ts as often as the video clock needs it.
+    def put(self, ts, frame):
+        h, w = frame.shape[:2]
+
+        if self.writer is None or self.size != (w, h) or self.full(ts):
+            self.rotate(ts, (w, h))
+
+        # frames the segment should hold once this one is on screen
+        due = int((ts - self.segment["start"]) * self.fps) + 1
+        if self.segment["frames"] >= due:
+            self.skipped += 1
+            return
+
+        while self.last is not None and self.segment["frames"] < due - 1:
+            self.writer.write(self.last)
+            self.segment["frames"] += 1
+        self.writer.write(frame)
+        self.last = frame
+
+        self.written += 1
+        self.segment["frames"] += 1
+        self.segment["end"] = ts
+
+    # ---------- SEGMENTS ----------
+
+    def full(self, ts):
+        if self.max_seconds and ts - self.segment["start"] >= self.max_seconds:
+            return True
+        # the file size lags the encoder a little; checked once a second
+        if self.max_bytes and ts - self.size_checked >= 1.0:
+            self.size_checked = ts
+            return os.path.getsize(self.path) >= self.max_bytes
+        return False
+
+    def rotate(self, ts, size):
+        self.finish()
+
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(ts))
+        self.path = os.path.join(self.out_dir, f"{self.prefix}_{stamp}_{self.segments:03d}{self.ext}")
+        self.writer = cv2.VideoWriter(self.path, self.fourcc, self.fps, size)
+        if not self.writer.isOpened():
+            raise RuntimeError(f"cannot open video writer for {self.path}")
+
+        self.size = size
+        self.size_checked = ts
+        self.last = None
+        with self.lock:
+            self.segments += 1
+            self.segment = {"path": self.path, "start": ts, "end": ts, "frames": 0, "dropped": 0}
+
+    def finish(self):
+        if self.writer is None:
+            return
+
+        self.writer.release()
+        self.writer = None
+
+        with self.lock:
+            line = json.dumps(self.segment)
+        with open(os.path.join(self.out_dir, "segments.jsonl"), "a") as f:
+            f.write(line + "\n")
+
+    def close(self):
+        while self.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.join()
+        print(self.summary())
+
+    def summary(self):
+        total = self.written + self.skipped + self.dropped
+        return (f"recorder: {self.written} frames in {self.segments} segment(s), "
+                f"{self.skipped} skipped over {self.fps:g} fps, "
+                f"{self.dropped} dropped ({self.dropped / max(total, 1) * 100:.1f}%)")
@@ -0,0 +1,271 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+from det_log import read_log
+from eco_scoring import PRESETS, class_table, hybrid_impact, linear_impact
+from tracking import MultiObjectTracker
+from writers import open_writer
+
+# Re-scores a detection log (det_log.py) under many impact-model settings at
+# once, without touching the camera or the model:
+#
+#   python replay.py detlog --model hybrid \
+#       --grid alpha=0.6:1.8:10 --grid beta=0.4:1.2:10 --grid max_impact=15:35:10 \
+#       --out sweep.csv
+#
+# Every swept model parameter gets its own array axis and the boxes the last
+# one, so the impact functions from eco_scoring broadcast over the whole
+# grid in one call (S ** alpha is computed once per alpha, not once per
+# setting). Boxes are summed into frame totals with one weighted bincount.
+#
+# max_impact only rescales the totals, so it never multiplies the per-frame
+# work: each chunk's totals are sorted once per model setting and the count,
+# sum and sum of squares of the totals below every eco bin edge of every
+# max_impact are read off with searchsorted. Those add up across chunks and
+# give each setting's eco histogram and its exact mean and std. The log is
+# walked in chunks sized so no intermediate array exceeds max_elements.
+#
+# Speeds come from the log. Boxes logged without one get the tracker re-run
+# over the logged boxes once, cached next to the log as replay_speed.f4.
+
+# Parameters each impact model accepts (besides max_impact, used by every model)
+MODEL_PARAMS = {
+    "linear": ("min_size_factor", "max_size_factor", "motion_sat"),
+    "hybrid": ("alpha", "beta", "speed_sat"),
+}
+
+IMPACT = {"linear": linear_impact, "hybrid": hybrid_impact}
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# ---------- LOADING ----------
+
+# Boxes of a detection log in the form score_boxes() expects: class ids,
+# area fractions and tracker speeds (px/s), plus per-frame box offsets.
+class Replay:
+
+    def __init__(self, path):
+        view = read_log(path)
+        self.path = path
+        self.view = view
+        self.names = view.names
+        self.start = np.asarray(view.start)
+        self.end = np.asarray(view.end)
+        self.cls = np.asarray(view.cls, dtype=np.int64)
+
+        w, h = view.meta.get("width", 1), view.meta.get("height", 1)
+        xy = view.xyxy
+        self.area = (xy[:, 2] - xy[:, 0]).astype(np.float64) * (xy[:, 3] - xy[:, 1]) / (w * h)
+        self.speed = self.load_speeds()
+
+    def __len__(self):
+        return len(self.end)
+
+    def load_speeds(self):
+        view = self.view
+        speed = np.asarray(view.speed, dtype=np.float64)
+        if not np.isnan(speed).any():
+            return speed
+
+        path = os.path.join(self.path, "replay_speed.f4")
+        n = len(self.cls)
+        if os.path.exists(path) and os.path.getsize(path) == n * 4:
+            return np.fromfile(path, dtype=np.float32).astype(np.float64)
+
+        tracker = MultiObjectTracker()
+        speed = np.zeros(n, dtype=np.float32)
+        t0 = time.perf_counter()
+
+        for i in range(len(view)):
+            a, b = self.start[i], self.end[i]
+            _, speed[a:b] = tracker.update(view.xyxy[a:b], self.cls[a:b], view.t[i], view.conf[a:b])
+
+        print(f"tracked {len(view)} frames in {time.perf_counter() - t0:.1f}s")
+        speed.tofile(path)
+        return speed.astype(np.float64)
+
+# ---------- SWEEP ----------
+
+class SweepResult:
+
+    def __init__(self, values, hist, mean, std, frames):
+        self.values = values          # {param: swept values}, in axis order
+        self.hist = hist              # (*shape, bins) frame counts over eco 0..100
+        self.mean = mean
+        self.std = std
+        self.frames = frames
+
+    @property
+    def shape(self):
+        return self.hist.shape[:-1]
+
+    # Eco index below which q% of frames fall, interpolated within the bins.
+    def percentile(self, q):
+        bins = self.hist.shape[-1]
+        cdf = np.cumsum(self.hist, axis=-1)
+        target = q / 100 * self.frames
+
+        k = np.minimum((cdf < target).sum(axis=-1), bins - 1)[..., None]
+        below = np.where(k > 0, np.take_along_axis(cdf, np.maximum(k - 1, 0), -1), 0)
+        count = np.take_along_axis(self.hist, k, -1)
+        frac = np.clip((target - below) / np.maximum(count, 1), 0, 1)
+        return ((k + frac) * (100 / bins))[..., 0]
+
+    # One dict per setting: swept parameter values, mean, std and percentiles.
+    def rows(self):
+        pct = {q: self.percentile(q) for q in PERCENTILES}
+        for idx in np.ndindex(*self.shape):
+            row = {name: float(v[i]) for (name, v), i in zip(self.values.items(), idx)}
+            row["mean"] = round(float(self.mean[idx]), 3)
+            row["std"] = round(float(self.std[idx]), 3)
+            for q in PERCENTILES:
+                row[f"p{q}"] = round(float(pct[q][idx]), 3)
+            yield row
+
+# Eco-index distribution of every combination of the `grid` values
+# ({param: values}) over all frames of `replay`. Parameters not in the grid
+# come from `fixed`, then from the model's preset.
+def sweep(replay, model, grid, table, fixed=None, bins=200, max_elements=1 << 22):
+    preset = PRESETS[model]
+    params = {**preset["params"], "max_impact": preset["max_impact"], **(fixed or {})}
+
+    axes = list(grid)
+    unknown = set(axes) - set(MODEL_PARAMS[model]) - {"max_impact"}
+    if unknown:
+        raise ValueError(f"{model} model has no parameter(s): {', '.join(sorted(unknown))}")
+
+    values = {name: np.asarray(grid[name], dtype=np.float64).ravel() for name in axes}
+    model_axes = [name for name in axes if name != "max_impact"]
+    model_shape = tuple(len(values[name]) for name in model_axes)
+    n_model = math.prod(model_shape)
+
+    # swept values on their own axis, trailing axis for boxes / frames
+    def arg(name):
+        if name not in values:
+            return params[name]
+        s = [1] * (len(model_axes) + 1)
+        s[model_axes.index(name)] = len(values[name])
+        return values[name].reshape(s)
+
+    kwargs = {name: arg(name) for name in MODEL_PARAMS[model] if name in params or name in values}
+    impact_fn = IMPACT[model]
+
+    # upper bin edges in total-impact units: eco bin bins - m holds the totals
+    # in (K (m - 1) / bins, K m / bins], the lowest bin also everything above K
+    K = values.get("max_impact", np.array([params["max_impact"]], dtype=np.float64))
+    edges = (K[:, None] * (np.arange(1, bins + 1) / bins)).ravel()
+
+    below = np.zeros((n_model, len(edges)), dtype=np.int64)
+    below_sum = np.zeros((n_model, len(edges)))
+    below_sq = np.zeros((n_model, len(edges)))
+    budget = max(max_elements // n_model, 1)
+
+    f0 = 0
+    while f0 < len(replay):
+        b0 = replay.start[f0]
+        f1 = int(np.searchsorted(replay.end, b0 + budget, side="right"))
+        f1 = min(max(f1, f0 + 1), f0 + budget, len(replay))
+        b1 = replay.end[f1 - 1]
+
+        base = table[replay.cls[b0:b1]]
+        speed = replay.speed[b0:b1] * preset["speed_scale"]
+        _, _, impact = impact_fn(base, replay.area[b0:b1], speed, **kwargs)
+        impact = np.broadcast_to(impact, model_shape + impact.shape[-1:]).reshape(n_model, -1)
+
+        # frame totals: one weighted bincount over (setting, frame) slots
+        n_frames = f1 - f0
+        frame_of_box = np.repeat(np.arange(n_frames), replay.end[f0:f1] - replay.start[f0:f1])
+        slot = (frame_of_box + (np.arange(n_model) * n_frames)[:, None]).ravel()
+        frame_total = np.bincount(slot, weights=impact.ravel(), minlength=n_model * n_frames)
+
+        totals = np.sort(frame_total.reshape(n_model, n_frames), axis=-1)
+        pos = np.stack([np.searchsorted(row, edges, side="right") for row in totals])
+        zero = np.zeros((n_model, 1))
+        below += pos
+        below_sum += np.take_along_axis(np.concatenate((zero, np.cumsum(totals, -1)), -1), pos, -1)
+        below_sq += np.take_along_axis(np.concatenate((zero, np.cumsum(totals ** 2, -1)), -1), pos, -1)
+
+        f0 = f1
+
+    frames = len(replay)
+    below = below.reshape(n_model, len(K), bins)
+    hist = np.diff(below, axis=-1, prepend=0)[..., ::-1].copy()
+    above = frames - below[..., -1]
+    hist[..., 0] += above
+
+    # eco = 100 (1 - min(total, K) / K)
+    clipped_sum = below_sum.reshape(n_model, len(K), bins)[..., -1] + K * above
+    clipped_sq = below_sq.reshape(n_model, len(K), bins)[..., -1] + K ** 2 * above
+    n = max(frames, 1)
+    mean = 100 * (1 - clipped_sum / n / K)
+    std = 100 * np.sqrt(np.maximum(clipped_sq / n - (clipped_sum / n) ** 2, 0)) / K
+
+    # (model settings, max_impact) -> grid axis order
+    shape = tuple(len(values[name]) for name in axes)
+    k_axis = axes.index("max_impact") if "max_impact" in values else None
+
+    def to_grid(a):
+        a = a.reshape(model_shape + a.shape[1:])
+        if k_axis is None:
+            return a.reshape(shape + a.shape[len(model_shape) + 1:])
+        return np.moveaxis(a, len(model_shape), k_axis)
+
+    return SweepResult(values, to_grid(hist), to_grid(mean), to_grid(std), frames)
+
+# "a:b:n" -> n values from a to b, "a,b,c" -> those values
+def parse_grid(specs):
+    grid = {}
+    for spec in specs:
+        name, _, vals = spec.partition("=")
+        if ":" in vals:
+            a, b, n = vals.split(":")
+            grid[name] = np.linspace(float(a), float(b), int(n))
+        else:
+            grid[name] = np.array([float(v) for v in vals.split(",")])
+    return grid
+
+# ---------- MAIN ----------
+
+def main():
+    ap = argparse.ArgumentParser(description="Sweep impact-model parameters over a detection log")
+    ap.add_argument("log", help="detection log folder (DETECTION_LOG)")
+    ap.add_argument("--model", choices=sorted(PRESETS), default="hybrid",
+                    help="impact model (linear: ecological_indicator.py, hybrid: eco_indicator_2.py)")
+    ap.add_argument("--grid", action="append", default=[], metavar="PARAM=A:B:N",
+                    help=f"values to sweep; params: {MODEL_PARAMS}, max_impact")
+    ap.add_argument("--bins", type=int, default=200, help="histogram bins over eco 0..100")
+    ap.add_argument("--out", help="one row per setting: .csv, .jsonl or .parquet")
+    args = ap.parse_args()
+
+    grid = parse_grid(args.grid)
+    replay = Replay(args.log)
+
+    preset = PRESETS[args.model]
+    table = class_table(preset["scores"], replay.names, preset["transform"])
+
+    t0 = time.perf_counter()
+    result = sweep(replay, args.model, grid, table, bins=args.bins)
+    dt = time.perf_counter() - t0
+
+    n_settings = math.prod(result.shape)
+    print(f"{n_settings} settings x {len(replay)} frames ({len(replay.cls)} boxes) in {dt:.2f}s")
+
+    rows = list(result.rows())
+    if args.out:
+        fields = [(name, "float") for name in grid] + [
+            (f, "float") for f in ("mean", "std", *(f"p{q}" for q in PERCENTILES))]
+        writer = open_writer(args.out, fields, False)
+        writer.write(rows)
+        writer.close()
+    else:
+        for row in rows[:50]:
+            print("  ".join(f"{k}={v:g}" for k, v in row.items()))
+        if len(rows) > 50:
+            print(f"... {len(rows) - 50} more (use --out)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from eco_scoring import box_arrays
+from motion_gate import MotionGate
+
+# Sliced inference for high-resolution cameras. At the default input size a
+# 4K frame is shrunk ~6x before YOLO sees it, so bottles, cups and phones
+# are a few pixels wide. The Tiler cuts the frame into overlapping
+# tile x tile crops, runs them (plus one downscaled full frame for the big
+# objects) as a single batch, shifts the boxes back to frame coordinates and
+# merges duplicates across tile borders:
+#
+#   detector = Detector(model, tracker, conf, tiler=Tiler(640, 0.2))
+#
+# With motion_only=True only tiles with motion are re-run; boxes in still
+# tiles are carried over from the previous pass, and every refresh_every
+# frames the whole grid runs again.
+#
+#   python tiling.py --video overhead_4k.mp4 --tile 640 --overlap 0.2
+#
+# reports full-frame vs tiled throughput and box counts.
+#
+# Exported ONNX / OpenVINO models have a fixed input size; use it as the tile.
+
+SMALL_CLASSES = ("bottle", "cup", "cell phone")
+
+def empty_boxes():
+    return (np.zeros((0, 4), dtype=np.float32),
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.float32))
+
+# ---------- GRID ----------
+
+# (n, 4) int xyxy tiles covering a w x h frame; the last row / column is
+# snapped to the frame edge so every tile is full size.
+def tile_grid(w, h, tile=640, overlap=0.2):
+    stride = max(int(tile * (1 - overlap)), 1)
+
+    def starts(size):
+        if size <= tile:
+            return [0]
+        return list(range(0, size - tile, stride)) + [size - tile]
+
+    return np.array([(x, y, min(x + tile, w), min(y + tile, h))
+                     for y in starts(h) for x in starts(w)], dtype=np.int64)
+
+# Tiles containing any motion pixel, counted in O(1) per tile from the
+# integral image of the (small) motion mask.
+def moving_tiles(tiles, mask, w, h):
+    mh, mw = mask.shape
+    ii = cv2.integral((mask > 0).astype(np.uint8))
+
+    x0 = tiles[:, 0] * mw // w
+    y0 = tiles[:, 1] * mh // h
+    x1 = -(-tiles[:, 2] * mw // w)
+    y1 = -(-tiles[:, 3] * mh // h)
+
+    count = ii[y1, x1] - ii[y0, x1] - ii[y1, x0] + ii[y0, x0]
+    return count > 0
+
+# ---------- MERGE ----------
+
+# Class-aware greedy NMS over the boxes of all tiles. Besides IoU, a box is
+# dropped when most of it lies inside a higher-scoring box of the same
+# class (intersection over the smaller area): the cut-off half of an object
+# at a tile border has low IoU with the full box but is contained in it.
+def merge_tiles(xyxy, cls, conf, iou_threshold=0.5, ios_threshold=0.8):
+    n = len(conf)
+    if n < 2:
+        return xyxy, cls, conf
+
+    order = np.argsort(-conf, kind="stable")
+    xyxy, cls, conf = xyxy[order], cls[order], conf[order]
+
+    iw = np.minimum(xyxy[:, None, 2], xyxy[None, :, 2]) - np.maximum(xyxy[:, None, 0], xyxy[None, :, 0])
+    ih = np.minimum(xyxy[:, None, 3], xyxy[None, :, 3]) - np.maximum(xyxy[:, None, 1], xyxy[None, :, 1])
+    inter = np.maximum(iw, 0) * np.maximum(ih, 0)
+
+    area = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    iou = inter / np.maximum(area[:, None] + area[None, :] - inter, 1e-9)
+    ios = inter / np.maximum(np.minimum(area[:, None], area[None, :]), 1e-9)
+
+    suppress = ((iou > iou_threshold) | (ios > ios_threshold)) & (cls[:, None] == cls[None, :])
+
+    keep = np.ones(n, dtype=bool)
+    for i in range(n):
+        if keep[i]:
+            keep[i + 1:] &= ~suppress[i, i + 1:]
+
+    return xyxy[keep], cls[keep], conf[keep]
+
+# ---------- TILER ----------
+
+class Tiler:
+
+    def __init__(self, tile=640, overlap=0.2, full_frame=True, motion_only=False,
+                 refresh_every=30, iou_threshold=0.5, ios_threshold=0.8):
+        self.tile = tile
+        self.overlap = overlap
+        self.full_frame = full_frame
+        self.refresh_every = refresh_every
+        self.iou_threshold = iou_threshold
+        self.ios_threshold = ios_threshold
+        self.gate = MotionGate(min_motion=0.0) if motion_only else None
+
+        self.size = None
+        self.grid = None
+        self.last = empty_boxes()
+
+        self.frames = 0
+        self.tiles_run = 0
+        self.infer_time = 0.0
+
+    def __call__(self, model, frame, **kwargs):
+        h, w = frame.shape[:2]
+        if self.size != (w, h):
+            self.grid = tile_grid(w, h, self.tile, self.overlap)
+            self.size = (w, h)
+            self.last = empty_boxes()
+
+        active = np.ones(len(self.grid), dtype=bool)
+        if self.gate is not None:
+            self.gate.moving(frame)
+            if self.frames % self.refresh_every:
+                active = moving_tiles(self.grid, self.gate.mask, w, h)
+
+        tiles = self.grid[active]
+        crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles.tolist()]
+        offsets = [(x0, y0) for x0, y0, _, _ in tiles.tolist()]
+        if self.full_frame:
+            crops.append(frame)
+            offsets.append((0, 0))
+
+        t0 = time.perf_counter()
+        results = model(crops, imgsz=self.tile, **kwargs) if crops else []
+        self.infer_time += time.perf_counter() - t0
+
+        parts = []
+        for res, (dx, dy) in zip(results, offsets):
+            xyxy, cls, conf = box_arrays(res)
+            parts.append((xyxy + np.array([dx, dy, dx, dy], dtype=xyxy.dtype), cls, conf))
+
+        if not active.all():
+            # still tiles keep their boxes from the previous pass
+            xyxy, cls, conf = self.last
+            cx = (xyxy[:, 0] + xyxy[:, 2]) / 2
+            cy = (xyxy[:, 1] + xyxy[:, 3]) / 2
+            inside = ((cx[:, None] >= tiles[None, :, 0]) & (cx[:, None] < tiles[None, :, 2]) &
+                      (cy[:, None] >= tiles[None, :, 1]) & (cy[:, None] < tiles[None, :, 3]))
+            stale = inside.any(axis=1)
+            parts.append((xyxy[~stale], cls[~stale], conf[~stale]))
+
+        if parts:
+            xyxy = np.concatenate([p[0] for p in parts]).astype(np.float32)
+            cls = np.concatenate([p[1] for p in parts])
+            conf = np.concatenate([p[2] for p in parts])
+            self.last = merge_tiles(xyxy, cls, conf, self.iou_threshold, self.ios_threshold)
+
+        self.frames += 1
+        self.tiles_run += len(tiles)
+        return self.last
+
+    def summary(self):
+        grid = len(self.grid) if self.grid is not None else 0
+        per_frame = self.tiles_run / max(self.frames, 1)
+        return (f"tiles: {per_frame:.1f}/{grid} per frame, "
+                f"{self.frames / max(self.infer_time, 1e-9):.1f} FPS inference")
+
+# ---------- REPORT ----------
+
+def run(video, frames, infer):
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise SystemExit(f"cannot open {video}")
+
+    n, boxes, t = 0, [], 0.0
+    while n < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        t0 = time.perf_counter()
+        boxes.append(infer(frame)[1])
+        t += time.perf_counter() - t0
+        n += 1
+
+    cap.release()
+    return n, t, boxes
+
+def main():
+    from backends import BACKENDS, load_model
+
+    ap = argparse.ArgumentParser(description="Full-frame vs tiled inference throughput")
+    ap.add_argument("--video", required=True)
+    ap.add_argument("--weights", default="yolov8n.pt")
+    ap.add_argument("--backend", choices=BACKENDS, default="torch")
+    ap.add_argument("--calib-dir", help="sample frames for the -int8 backends")
+    ap.add_argument("--tile", type=int, default=640)
+    ap.add_argument("--overlap", type=float, default=0.2)
+    ap.add_argument("--motion-only", action="store_true", help="re-run only tiles with motion")
+    ap.add_argument("--no-full-frame", action="store_true", help="skip the downscaled full-frame pass")
+    ap.add_argument("--conf", type=float, default=0.35)
+    ap.add_argument("--frames", type=int, default=200)
+    args = ap.parse_args()
+
+    model = load_model(args.backend, args.weights, args.tile, args.calib_dir)
+    names = model.names
+    small = [i for i, name in names.items() if name in SMALL_CLASSES]
+
+    tiler = Tiler(args.tile, args.overlap, not args.no_full_frame, args.motion_only)
+
+    modes = {
+        "full frame": lambda f: box_arrays(model(f, conf=args.conf, imgsz=args.tile, verbose=False)[0]),
+        "tiled": lambda f: tiler(model, f, conf=args.conf, verbose=False),
+    }
+
+    print(f"{'mode':<12}{'frames':>8}{'FPS':>8}{'boxes/frame':>13}{'small/frame':>13}")
+    for mode, infer in modes.items():
+        n, t, boxes = run(args.video, args.frames, infer)
+        all_cls = np.concatenate(boxes) if boxes else np.zeros(0, dtype=np.int64)
+        print(f"{mode:<12}{n:>8}{n / max(t, 1e-9):>8.1f}"
+              f"{len(all_cls) / max(n, 1):>13.1f}{np.isin(all_cls, small).sum() / max(n, 1):>13.1f}")
+
+    print(tiler.summary())
+    print(f"(small = {', '.join(SMALL_CLASSES)})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import numpy as np
+
+# Multi-object tracker with persistent ids. Every track carries a constant
+# velocity Kalman state [cx, cy, w, h, vx, vy, vw, vh] (velocities in
+# pixels/second, driven by the frame timestamps), and all tracks are
+# predicted, associated and corrected together as arrays.
+
+# ---------- BOX HELPERS ----------
+
+def xyxy_to_cxcywh(xyxy):
+    xyxy = np.asarray(xyxy, dtype=np.float64)
+    wh = xyxy[:, 2:] - xyxy[:, :2]
+    return np.concatenate((xyxy[:, :2] + wh / 2, wh), axis=1)
+
+def cxcywh_to_xyxy(cxcywh):
+    half = cxcywh[:, 2:] / 2
+    return np.concatenate((cxcywh[:, :2] - half, cxcywh[:, :2] + half), axis=1)
+
+def iou_matrix(a, b):
+    iw = np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])
+    ih = np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])
+    inter = np.maximum(iw, 0) * np.maximum(ih, 0)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+# ---------- ASSOCIATION ----------
+
+# Greedy assignment without a Python loop over pairs: each round accepts every
+# (row, col) that are each other's best remaining candidate. The global best
+# pair is always mutual, so every round makes progress; in practice a frame
+# settles in two or three rounds.
+def greedy_match(score, threshold):
+    score = score.copy()
+    rows_out, cols_out = [], []
+
+    if score.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    all_rows = np.arange(score.shape[0])
+
+    while True:
+        best_col = score.argmax(axis=1)
+        best_row = score.argmax(axis=0)
+
+        ok = (score[all_rows, best_col] >= threshold) & (best_row[best_col] == all_rows)
+        rows = np.flatnonzero(ok)
+        if len(rows) == 0:
+            break
+
+        cols = best_col[rows]
+        rows_out.append(rows)
+        cols_out.append(cols)
+
+        score[rows, :] = -np.inf
+        score[:, cols] = -np.inf
+
+    if not rows_out:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(rows_out), np.concatenate(cols_out)
+
+# ---------- TRACKER ----------
+
+class MultiObjectTracker:
+
+    def __init__(self, iou_threshold=0.3, center_gate=1.0, max_age=1.0,
+                 std_meas=0.05, std_pos=1.0, std_vel=5.0):
+        self.iou_threshold = iou_threshold
+        self.center_gate = center_gate    # in track diagonals
+        self.max_age = max_age            # seconds without a match
+        self.std_meas = std_meas          # noise terms relative to box height
+        self.std_pos = std_pos
+        self.std_vel = std_vel
+
+        self.next_id = 1
+        self.t = None
+        self.last_update = None           # time of the latest update()
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.cls = np.zeros(0, dtype=np.int64)
+        self.conf = np.zeros(0)
+        self.x = np.zeros((0, 8))
+        self.P = np.zeros((0, 8, 8))
+        self.last_seen = np.zeros(0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Advance every track to `now`; returns the predicted xyxy boxes.
+    def predict(self, now):
+        dt = 0.0 if self.t is None else max(now - self.t, 0.0)
+        self.t = now
+
+        if len(self.ids) and dt > 0:
+            F = np.eye(8)
+            F[:4, 4:] = dt * np.eye(4)
+
+            h = np.maximum(self.x[:, 3], 1.0)
+            q = np.concatenate((
+                np.repeat((self.std_pos * h * dt)[:, None] ** 2, 4, axis=1),
+                np.repeat((self.std_vel * h * dt)[:, None] ** 2, 4, axis=1)
+            ), axis=1)
+
+            self.x = self.x @ F.T
+            self.P = F @ self.P @ F.T + q[:, :, None] * np.eye(8)
+
+        return cxcywh_to_xyxy(self.x[:, :4])
+
+    def speeds(self):
+        return np.hypot(self.x[:, 4], self.x[:, 5])
+
+    def boxes(self):
+        return cxcywh_to_xyxy(self.x[:, :4])
+
+    # Associate detections with tracks at timestamp `now`.
+    # Returns (track id, speed in px/s) for every detection, in input order.
+    def update(self, xyxy, cls, now, conf=None):
+        xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        cls = np.asarray(cls, dtype=np.int64)
+        n = len(xyxy)
+        conf = np.ones(n) if conf is None else np.asarray(conf, dtype=np.float64)
+
+        pred = self.predict(now)
+        self.last_update = now
+        det_track = np.full(n, -1, dtype=np.int64)
+
+        if len(self.ids) and n:
+            same = self.cls[:, None] == cls[None, :]
+
+            # 1) overlap
+            iou = np.where(same, iou_matrix(pred, xyxy), 0.0)
+            rows, cols = greedy_match(iou, self.iou_threshold)
+            det_track[cols] = rows
+
+            # 2) centre distance for what overlap missed (fast or small objects)
+            free_t = np.setdiff1d(np.arange(len(self.ids)), rows)
+            free_d = np.flatnonzero(det_track < 0)
+
+            if len(free_t) and len(free_d):
+                tc = self.x[free_t, :2]
+                dc = (xyxy[free_d, :2] + xyxy[free_d, 2:]) / 2
+                diag = np.hypot(self.x[free_t, 2], self.x[free_t, 3])
+
+                dist = np.hypot(tc[:, None, 0] - dc[None, :, 0],
+                                tc[:, None, 1] - dc[None, :, 1])
+                aff = 1 - dist / np.maximum(self.center_gate * diag[:, None], 1e-9)
+                aff = np.where(same[np.ix_(free_t, free_d)], aff, -np.inf)
+
+                r2, c2 = greedy_match(aff, 1e-9)
+                det_track[free_d[c2]] = free_t[r2]
+
+        matched = np.flatnonzero(det_track >= 0)
+        if len(matched):
+            self._correct(det_track[matched], xyxy_to_cxcywh(xyxy[matched]))
+            self.last_seen[det_track[matched]] = now
+            self.conf[det_track[matched]] = conf[matched]
+
+        # births
+        new = np.flatnonzero(det_track < 0)
+        if len(new):
+            det_track[new] = np.arange(len(self.ids), len(self.ids) + len(new))
+            self._spawn(xyxy[new], cls[new], conf[new], now)
+
+        ids = self.ids[det_track]
+        speed = self.speeds()[det_track]
+
+        # deaths
+        alive = now - self.last_seen <= self.max_age
+        if not alive.all():
+            self._keep(alive)
+
+        return ids, speed
+
+    def _correct(self, idx, z):
+        x = self.x[idx]
+        P = self.P[idx]
+
+        h = np.maximum(x[:, 3], 1.0)
+        R = ((self.std_meas * h) ** 2)[:, None, None] * np.eye(4)
+
+        S = P[:, :4, :4] + R
+        K = P[:, :, :4] @ np.linalg.inv(S)
+        y = z - x[:, :4]
+
+        self.x[idx] = x + (K @ y[:, :, None])[:, :, 0]
+        self.P[idx] = P - K @ P[:, :4, :]
+
+    def _spawn(self, xyxy, cls, conf, now):
+        k = len(xyxy)
+        z = xyxy_to_cxcywh(xyxy)
+        h = np.maximum(z[:, 3], 1.0)
+
+        x = np.concatenate((z, np.zeros((k, 4))), axis=1)
+        var = np.concatenate((
+            np.repeat((2 * self.std_meas * h)[:, None] ** 2, 4, axis=1),
+            np.repeat((10 * h)[:, None] ** 2, 4, axis=1)
+        ), axis=1)
+
+        self.ids = np.concatenate((self.ids, np.arange(self.next_id, self.next_id + k)))
+        self.next_id += k
+        self.cls = np.concatenate((self.cls, cls))
+        self.conf = np.concatenate((self.conf, conf))
+        self.x = np.concatenate((self.x, x))
+        self.P = np.concatenate((self.P, var[:, :, None] * np.eye(8)))
+        self.last_seen = np.concatenate((self.last_seen, np.full(k, now)))
+
+    def _keep(self, mask):
+        self.ids = self.ids[mask]
+        self.cls = self.cls[mask]
+        self.conf = self.conf[mask]
+        self.x = self.x[mask]
+        self.P = self.P[mask]
+        self.last_seen = self.last_seen[mask]
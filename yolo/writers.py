@@ -0,0 +1,153 @@
+import csv
+import json
+import os
+
+# Row writers shared by the batch tools (batch_score, yolo_image_detection,
+# replay), picked by file extension:
+#
+#   out = open_writer("eco.csv", [("video", "str"), ("eco_index", "float")], append=False)
+#   out.write([{"video": "a.mp4", "eco_index": 81.2}])
+#   out.flush()                # on disk (fsync) before a checkpoint says so
+#   out.close()
+#
+# .parquet needs pyarrow, .jsonl and anything else (CSV) only the standard
+# library. With append=True a resumed run adds to what is already there.
+#
+# position() is what a checkpoint should store after flush(); passing it back
+# as resume_at first cuts off whatever was written after that checkpoint, so
+# a crash between the two never leaves duplicate rows behind.
+
+class CsvWriter:
+
+    def __init__(self, path, fields, append, resume_at=None):
+        exists = append and os.path.exists(path)
+        if exists and resume_at is not None:
+            os.truncate(path, resume_at)
+        self.path = path
+        self.f = open(path, "a" if exists else "w", newline="")
+        self.w = csv.DictWriter(self.f, fieldnames=[name for name, _ in fields])
+        if not exists:
+            self.w.writeheader()
+
+    def write(self, rows):
+        self.w.writerows(rows)
+
+    def flush(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    # byte offset
+    def position(self):
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+class JsonlWriter:
+
+    def __init__(self, path, fields, append, resume_at=None):
+        if append and resume_at is not None and os.path.exists(path):
+            os.truncate(path, resume_at)
+        self.path = path
+        self.f = open(path, "a" if append else "w")
+
+    def write(self, rows):
+        self.f.writelines(json.dumps(row) + "\n" for row in rows)
+
+    def flush(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    # byte offset
+    def position(self):
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+def part_path(path, part):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.part{part}{ext}" if part else path
+
+# Parquet files cannot be appended to and are only readable once closed (the
+# footer is written last), so every flush() closes the current part and the
+# next write() starts a new one next to the first (eco.parquet,
+# eco.part1.parquet, ...). position() is the number of closed parts; with
+# resume_at the parts after that are removed, and without append all old
+# parts are. A flush() after any write() closes a part even if no rows came,
+# so writers flushed together keep the same part numbering.
+class ParquetWriter:
+
+    def __init__(self, path, fields, append, resume_at=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+
+        if not append:
+            self.trim(path, 0)
+        elif resume_at is not None:
+            self.trim(path, resume_at)
+
+        part = 0
+        while os.path.exists(part_path(path, part)):
+            part += 1
+
+        types = {"str": pa.string(), "int": pa.int64(), "float": pa.float64()}
+        self.pa = pa
+        self.pq = pq
+        self.base = path
+        self.path = None
+        self.part = part
+        self.schema = pa.schema([(name, types[t]) for name, t in fields])
+        self.w = None
+
+    # Remove part `parts` and every part after it.
+    @staticmethod
+    def trim(path, parts):
+        while os.path.exists(part_path(path, parts)):
+            os.remove(part_path(path, parts))
+            parts += 1
+
+    def write(self, rows):
+        if self.w is None:
+            self.path = part_path(self.base, self.part)
+            self.w = self.pq.ParquetWriter(self.path, self.schema)
+        if rows:
+            self.w.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def flush(self):
+        if self.w is None:
+            return
+        self.w.close()
+        self.w = None
+        with open(self.path, "rb") as f:
+            os.fsync(f.fileno())
+        self.part += 1
+
+    # closed parts
+    def position(self):
+        return self.part
+
+    def close(self):
+        self.flush()
+
+# How many of the first `parts` parts of a Parquet output can be read back.
+def readable_parts(path, parts):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    for part in range(parts):
+        try:
+            pq.read_metadata(part_path(path, part))
+        except (OSError, pa.ArrowInvalid):
+            return part
+    return parts
+
+def open_writer(path, fields, append, resume_at=None):
+    if path.endswith(".parquet"):
+        return ParquetWriter(path, fields, append, resume_at)
+    if path.endswith(".jsonl"):
+        return JsonlWriter(path, fields, append, resume_at)
+    return CsvWriter(path, fields, append, resume_at)
@@ -1,29 +1,123 @@
-from ultralytics import YOLO
 import cv2
+import os
+import sys
+import time
+import signal
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from profiling import profiler
+
+from motion_gate import MotionGate
+from backends import load_model
+from metrics import MetricsServer
+from recorder import Recorder
+
+# Skip inference while the scene is static and reuse the last detections
+MOTION_GATE = False
+
+# Inference backend: "torch", "onnx", "onnx-int8", "openvino", "openvino-int8"
+# (exported and cached next to the weights on first use; the -int8 ones
+# calibrate on the sample frames in CALIB_DIR)
+BACKEND = "torch"
+CALIB_DIR = None
+
+# Run without windows or drawing (display-less servers); stop with Ctrl+C
+HEADLESS = False
+
+# Serve detections per class, FPS and inference latency in Prometheus text
+# format on this local port (e.g. 9108)
+METRICS_PORT = None
+
+# Record the annotated stream to segmented video files in this folder (e.g.
+# "recordings"), starting a new file every RECORD_SEGMENT_SECONDS and/or
+# RECORD_SEGMENT_MB
+RECORD_DIR = None
+RECORD_SEGMENT_SECONDS = 600
+RECORD_SEGMENT_MB = None
 
 # Load YOLO model
-model = YOLO("yolov8n.pt")
+model = load_model(BACKEND, "yolov8n.pt", calib_dir=CALIB_DIR)
+gate = MotionGate() if MOTION_GATE else None
+results = None
+metrics = MetricsServer(METRICS_PORT, prefix="yolo_webcam_") if METRICS_PORT else None
 
 # Open webcam
 cap = cv2.VideoCapture(0)
+recorder = Recorder.from_config(RECORD_DIR, RECORD_SEGMENT_SECONDS, RECORD_SEGMENT_MB)
+
+frames = 0
+infer_time = 0.0
+prev_time = time.time()
+
+# Ctrl+C ends the headless loop cleanly
+stop = threading.Event()
+if HEADLESS:
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
 
-while True:
-    ret, frame = cap.read()
+while not stop.is_set():
+    with profiler.span("capture"):
+        ret, frame = cap.read()
     if not ret:
         break
 
-    # Run YOLO detection
-    results = model(frame)
+    # Run YOLO detection (or keep the last results for a static scene)
+    if gate is None or gate.moving(frame) or results is None:
+        t0 = time.perf_counter()
+        with profiler.span("model"):
+            results = model(frame, verbose=not HEADLESS)
+        infer_time = time.perf_counter() - t0
+        if gate is not None:
+            gate.record_inference(infer_time)
 
-    # Draw results
-    annotated_frame = results[0].plot()
+    frames += 1
+
+    if metrics is not None:
+        now = time.time()
+        fps = 1 / max(now - prev_time, 1e-9)
+        prev_time = now
+
+        counts = Counter(results[0].names[c] for c in results[0].boxes.cls.int().tolist())
+        metrics.publish(
+            detections=counts,
+            fps=fps,
+            frames_total=frames,
+            stage_latency_seconds={"inference": infer_time},
+        )
+
+    if HEADLESS:
+        continue
+
+    # Draw results on the current frame
+    with profiler.span("draw"):
+        annotated_frame = results[0].plot(img=frame)
+
+    if gate is not None:
+        cv2.putText(annotated_frame, gate.summary(), (10, 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
 
     # Display frame
-    cv2.imshow("YOLO Webcam Detection", annotated_frame)
+    if recorder is not None:
+        recorder.write(annotated_frame)
+
+    with profiler.span("display"):
+        cv2.imshow("YOLO Webcam Detection", annotated_frame)
+        key = cv2.waitKey(1)
 
     # Press 'q' to quit
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    if key & 0xFF == ord('q'):
         break
 
+if gate is not None:
+    print(gate.summary())
+
+if recorder is not None:
+    recorder.close()
+
+if metrics is not None:
+    metrics.close()
+
 cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+if not HEADLESS:
+    cv2.destroyAllWindows()
\ No newline at end of file